@@ -0,0 +1,73 @@
+"""
+Compare the greedy and optimized matchers on synthetic waiting pools.
+
+    python benchmarks/compare_matchers.py --users 300 3000 30000 --skew 0.5
+
+Reports the planning time and the quality of the teams: the share of required skills
+each team covers, how far team experience strays from the pool's mean, and how long
+the longest-waiting user left without a team has waited.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "benchmark")
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+import config
+from benchmarks.synthetic import make_pool
+from src.services import optimizer
+from src.services.matcher import plan_batch_teams
+
+def measure(teams, users_by_skill):
+    """Score planned teams: skill coverage, experience gap and the longest wait left unmatched"""
+    levels = {level: index / (len(config.EXPERIENCE_LEVELS) - 1) for index, level in enumerate(config.EXPERIENCE_LEVELS)}
+    users = [user for bucket in users_by_skill.values() for user in bucket]
+    mean_experience = statistics.mean(levels[user.experience] for user in users)
+    covered = min(config.TEAM_SIZE, len(config.REQUIRED_SKILLS))
+
+    matched = {user.id for team in teams for user in team}
+    unmatched = [user for user in users if user.id not in matched]
+    newest = max(user.registration_time for user in users)
+
+    return {
+        "coverage": statistics.mean(len({user.skill for user in team}) / covered for team in teams),
+        "experience_gap": statistics.mean(
+            abs(statistics.mean(levels[user.experience] for user in team) - mean_experience) for team in teams
+        ),
+        "max_unmatched_wait_min": max(
+            ((newest - user.registration_time).total_seconds() / 60 for user in unmatched), default=0
+        ),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[300, 3000, 30000])
+    parser.add_argument("--skew", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    planners = {"greedy": lambda pool: plan_batch_teams(pool)}
+    if optimizer.is_available():
+        planners["optimized"] = lambda pool: optimizer.plan_optimized_teams(pool)
+    else:
+        print("NumPy is not installed, only the greedy matcher is measured")
+
+    print(f"{'users':>7} {'mode':>10} {'time ms':>9} {'teams':>6} {'coverage':>9} {'exp gap':>8} {'max wait':>9}")
+    for user_count in args.users:
+        pool = make_pool(user_count, args.skew, args.seed)
+        for mode, planner in planners.items():
+            started = time.perf_counter()
+            teams = planner(pool)
+            elapsed = (time.perf_counter() - started) * 1000
+            quality = measure(teams, pool)
+            print(
+                f"{user_count:>7} {mode:>10} {elapsed:>9.1f} {len(teams):>6} {quality['coverage']:>9.3f} "
+                f"{quality['experience_gap']:>8.3f} {quality['max_unmatched_wait_min']:>9.0f}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Benchmark the matching and registration hot paths on an in-memory SQLite database.
+
+    python benchmarks/run.py --users 100 1000 10000 100000 --skew 0.3
+    python benchmarks/run.py --save baseline.json
+    python benchmarks/run.py --baseline baseline.json --tolerance 0.5
+
+Reports the throughput and p50/p99 latency of find_potential_team, create_team_from_users,
+batch_match_teams and full registrations through the bot handlers with a fake bot.
+With --baseline the run fails when a p99 latency regresses by more than the tolerance.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The runner deletes every row between runs, so it never uses the configured database
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "benchmark")
+# The fake bot needs no rate limiting, and the pools are planned in this process
+os.environ.setdefault("NOTIFY_GLOBAL_RATE", "1000000")
+os.environ.setdefault("NOTIFY_PER_CHAT_RATE", "1000000")
+os.environ.setdefault("MATCH_WORKERS", "1")
+
+from sqlalchemy import insert
+
+import config
+from benchmarks.synthetic import make_pool
+from src.database.cache import team_cache, user_cache
+from src.database.models import RegistrationState, Team, TeamMember, User
+from src.database.schema import create_schema
+from src.database.session import engine, unit_of_work
+from src.services import matcher, team_manager
+from src.services.pool import load_waiting_pool, waiting_pool
+
+INSERT_CHUNK_SIZE = 5000
+
+# Telegram IDs of the users registering through the handlers, clear of the seeded users
+REGISTRATION_TELEGRAM_ID = 10 ** 9
+
+def percentile(samples, fraction):
+    """Get the sample below which the given fraction of the samples fall"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def summarize(benchmark, user_count, samples, elapsed):
+    """Build a result row from latency samples in seconds and the total elapsed time"""
+    return {
+        "benchmark": benchmark,
+        "users": user_count,
+        "ops": len(samples),
+        "ops_per_sec": len(samples) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+    }
+
+def reset_database():
+    """Delete every row and empty the waiting pools and the caches"""
+    if engine.url.database not in (None, "", ":memory:"):
+        raise RuntimeError(f"Refusing to benchmark on {engine.url!r}, only in-memory SQLite is used")
+
+    with unit_of_work() as db:
+        db.query(TeamMember).delete()
+        db.query(Team).delete()
+        db.query(User).delete()
+        db.query(RegistrationState).delete()
+    waiting_pool.clear()
+    user_cache.clear()
+    team_cache.clear()
+
+def seed_users(user_count, skew, waiting=True):
+    """Insert user_count users in bulk, loading them into the waiting pool if they are waiting"""
+    rows = [
+        dict(entry._asdict(), is_waiting=waiting)
+        for users in make_pool(user_count, skew).values()
+        for entry in users
+    ]
+    with unit_of_work() as db:
+        for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+            db.execute(insert(User), rows[start:start + INSERT_CHUNK_SIZE])
+    if waiting:
+        load_waiting_pool()
+
+def timed(func, *args):
+    """Call func and return its latency in seconds"""
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+def bench_find_potential_team(user_count, iterations):
+    samples = [timed(matcher.find_potential_team) for _ in range(iterations)]
+    return summarize("find_potential_team", user_count, samples, sum(samples))
+
+def bench_create_team_from_users(user_count, teams):
+    groups = matcher.plan_batch_teams(waiting_pool.pool().snapshot())[:teams]
+    samples = [timed(team_manager.create_team_from_users, group) for group in groups]
+    return summarize("create_team_from_users", user_count, samples, sum(samples))
+
+def bench_batch_match_teams(user_count, skew, repeat):
+    samples = []
+    for _ in range(repeat):
+        reset_database()
+        seed_users(user_count, skew)
+        samples.append(timed(matcher.batch_match_teams))
+    return summarize("batch_match_teams", user_count, samples, sum(samples))
+
+class FakeBot:
+    """Accepts every message without sending it"""
+
+    def __init__(self):
+        self.sent = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent += 1
+
+class FakeReply:
+    """Records the keyboard of the last message or edit, like a chat the user reads"""
+
+    def __init__(self, user):
+        self.from_user = user
+        self.data = None
+        self.reply_markup = None
+
+    async def reply_text(self, text, reply_markup=None, **kwargs):
+        self.reply_markup = reply_markup
+
+    async def edit_message_text(self, text, reply_markup=None, **kwargs):
+        self.reply_markup = reply_markup
+
+    async def answer(self, *args, **kwargs):
+        pass
+
+    def press(self, index):
+        """Press a button of the last keyboard, returning the callback query"""
+        buttons = [button for row in self.reply_markup.inline_keyboard for button in row]
+        self.data = buttons[index % len(buttons)].callback_data
+        return SimpleNamespace(callback_query=self)
+
+async def bench_button_callback(user_count, registrations):
+    """
+    Register users through /start, the skill and the experience buttons. The matching
+    runs they schedule, and the notifications, run between registrations: the in-memory
+    database is a single connection that cannot hold two transactions at once.
+    """
+    from src.bot import handlers
+
+    jobs = []
+
+    class FakeJobQueue:
+        def run_once(self, callback, when, name=None):
+            jobs.append(callback)
+
+    context = SimpleNamespace(bot=FakeBot(), job_queue=FakeJobQueue(), args=[])
+    samples = []
+
+    started = time.perf_counter()
+    for index in range(registrations):
+        user = SimpleNamespace(id=REGISTRATION_TELEGRAM_ID + index, username=f"bench{index}")
+        chat = FakeReply(user)
+        updates = [
+            (handlers.start, SimpleNamespace(effective_user=user, message=chat)),
+            (handlers.button_callback, lambda: chat.press(index)),
+            (handlers.button_callback, lambda: chat.press(index)),
+        ]
+        for handler, update in updates:
+            update = update() if callable(update) else update
+            update_started = time.perf_counter()
+            await handler(update, context)
+            samples.append(time.perf_counter() - update_started)
+
+        while jobs:
+            await jobs.pop(0)(context)
+    elapsed = time.perf_counter() - started
+
+    return summarize("button_callback", user_count, samples, elapsed)
+
+async def run_benchmarks(user_counts, skew=0.3, registrations=300, repeat=3, iterations=1000):
+    """
+    Run every benchmark for each pool size.
+    Returns a list of result rows.
+    """
+    create_schema()
+    results = []
+
+    for user_count in user_counts:
+        reset_database()
+        seed_users(user_count, skew)
+        results.append(bench_find_potential_team(user_count, iterations))
+        results.append(bench_create_team_from_users(user_count, min(200, user_count // config.TEAM_SIZE)))
+        results.append(bench_batch_match_teams(user_count, skew, repeat))
+
+        # Registrations run against a table of user_count users who already have a team
+        reset_database()
+        seed_users(user_count, skew, waiting=False)
+        results.append(await bench_button_callback(user_count, registrations))
+
+    reset_database()
+    return results
+
+def find_regressions(results, baseline, tolerance):
+    """List the results whose p99 latency grew by more than tolerance over the baseline"""
+    previous = {(row["benchmark"], row["users"]): row for row in baseline}
+    regressions = []
+    for row in results:
+        before = previous.get((row["benchmark"], row["users"]))
+        if before and row["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+            regressions.append((row, before))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--skew", type=float, default=0.3)
+    parser.add_argument("--registrations", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare the results with this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    results = asyncio.run(run_benchmarks(args.users, args.skew, args.registrations, args.repeat))
+
+    print(f"{'benchmark':>24} {'users':>7} {'ops':>6} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for row in results:
+        print(
+            f"{row['benchmark']:>24} {row['users']:>7} {row['ops']:>6} {row['ops_per_sec']:>10.1f} "
+            f"{row['p50_ms']:>9.3f} {row['p99_ms']:>9.3f}"
+        )
+
+    if args.save:
+        with open(args.save, "w") as output:
+            json.dump(results, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = find_regressions(results, json.load(baseline_file), args.tolerance)
+        for row, before in regressions:
+            print(
+                f"REGRESSION {row['benchmark']} at {row['users']} users: "
+                f"p99 {before['p99_ms']:.3f} ms -> {row['p99_ms']:.3f} ms"
+            )
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
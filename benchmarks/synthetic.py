@@ -0,0 +1,32 @@
+"""Synthetic waiting pools shared by the benchmarks."""
+import random
+from datetime import datetime, timedelta
+
+import config
+from src.services.pool import PoolEntry
+
+START = datetime(2024, 1, 1)
+
+def make_pool(user_count, skew, seed=0, first_id=1):
+    """
+    Generate a waiting pool snapshot of user_count users, one registration per minute.
+    skew is the extra share of users with the first skill (0 is uniform, 1 is only that skill).
+    Returns a dictionary mapping each skill to its users in registration order.
+    """
+    rng = random.Random(seed)
+    skills = config.REQUIRED_SKILLS
+    weights = [(1 - skew) / len(skills) + (skew if index == 0 else 0) for index in range(len(skills))]
+
+    users_by_skill = {skill: [] for skill in skills}
+    for user_id in range(first_id, first_id + user_count):
+        skill = rng.choices(skills, weights)[0]
+        users_by_skill[skill].append(PoolEntry(
+            id=user_id,
+            telegram_id=100000 + user_id,
+            username=f"user{user_id}",
+            event_id=config.DEFAULT_EVENT,
+            skill=skill,
+            experience=rng.choice(config.EXPERIENCE_LEVELS),
+            registration_time=START + timedelta(minutes=user_id)
+        ))
+    return users_by_skill
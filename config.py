@@ -1,4 +1,5 @@
 import os
+import json
 from dotenv import load_dotenv
 
 # Load environment variables from .env file (only in development)
@@ -10,6 +11,21 @@ TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 if not TELEGRAM_BOT_TOKEN:
     raise ValueError("No TELEGRAM_BOT_TOKEN found in environment variables")
 
+# How the bot receives updates: "polling" or "webhook"
+BOT_RUN_MODE = os.getenv("BOT_RUN_MODE", "polling").lower()
+
+# Webhook settings (only used in webhook mode)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # Public base URL, e.g. https://my-bot.up.railway.app
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("PORT", "8080"))
+WEBHOOK_SECRET_TOKEN = os.getenv("WEBHOOK_SECRET_TOKEN")
+if BOT_RUN_MODE == "webhook" and not WEBHOOK_URL:
+    raise ValueError("No WEBHOOK_URL found in environment variables, required in webhook mode")
+
+# Number of updates processed concurrently
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", "16"))
+
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
@@ -20,10 +36,79 @@ if not DATABASE_URL:
 if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
+# Run the database migrations when the bot starts; disable when they run as a separate release step
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "true").lower() == "true"
+
+# Connection pool settings (ignored for SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # 30 minutes in seconds
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# Number of worker threads running blocking database calls for the bot's event loop
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", "4"))
+
+# Cache of users looked up by Telegram ID
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "300"))  # 5 minutes in seconds
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+
+# Cache of the teams waiting for confirmation; 0 disables it, e.g. when several bot replicas run
+TEAM_CACHE_SIZE = int(os.getenv("TEAM_CACHE_SIZE", "10000"))
+
+# Registration conversation state: "memory" (per process) or "database" (survives restarts, shared by replicas)
+STATE_STORE = os.getenv("STATE_STORE", "memory").lower()
+STATE_TTL = int(os.getenv("STATE_TTL", "86400"))  # 1 day in seconds
+STATE_MAX_ENTRIES = int(os.getenv("STATE_MAX_ENTRIES", "10000"))
+
 # Team formation settings
 TEAM_SIZE = 3
 REQUIRED_SKILLS = ["Frontend Development", "Backend Development", "Design"]
 EXPERIENCE_LEVELS = ["1 year", "2 years", "More than 2 years"]
 
+# Hackathon events served by this deployment. Users join an event through the /start deep link
+# parameter; HACKATHON_EVENTS is a JSON object mapping event codes to overrides of the settings
+# above, e.g. {"spring": {"team_size": 4}, "design-jam": {"required_skills": ["UX", "UI"]}}
+DEFAULT_EVENT = os.getenv("DEFAULT_EVENT", "default")
+EVENTS = {DEFAULT_EVENT: {}}
+EVENTS.update(json.loads(os.getenv("HACKATHON_EVENTS", "{}")))
+
+def get_event_settings(event_id):
+    """Get the team formation settings of an event, falling back to the defaults"""
+    settings = EVENTS.get(event_id) or {}
+    return {
+        "team_size": settings.get("team_size", TEAM_SIZE),
+        "required_skills": settings.get("required_skills", REQUIRED_SKILLS),
+        "experience_levels": settings.get("experience_levels", EXPERIENCE_LEVELS),
+    }
+
+# Matching mode: "greedy" forms teams in registration order, "optimized" also balances
+# skills and experience across the teams (needs NumPy; the bot refuses to start without it)
+MATCH_MODE = os.getenv("MATCH_MODE", "greedy")
+
+# Number of worker processes matching events in parallel (0 uses every CPU, 1 matches in the bot process)
+MATCH_WORKERS = int(os.getenv("MATCH_WORKERS", "0"))
+
+# Logging: level, "text" or "json" lines, and how many sampled per-update events to skip
+# per one written (1 writes them all)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "1"))
+
+# Seconds between metric summaries written to the log (0 disables them; webhook mode also serves /metrics)
+METRICS_LOG_INTERVAL = int(os.getenv("METRICS_LOG_INTERVAL", "300"))
+
+# Notification rate limits (Telegram allows about 30 messages per second overall and 1 per second per chat)
+NOTIFY_GLOBAL_RATE = float(os.getenv("NOTIFY_GLOBAL_RATE", "25"))
+NOTIFY_PER_CHAT_RATE = float(os.getenv("NOTIFY_PER_CHAT_RATE", "1"))
+NOTIFY_MAX_RETRIES = int(os.getenv("NOTIFY_MAX_RETRIES", "3"))
+
+# Registrations arriving within this many seconds are matched in a single run
+MATCH_DEBOUNCE = float(os.getenv("MATCH_DEBOUNCE", "1.0"))
+
 # Message timeouts
 CONFIRMATION_TIMEOUT = 3600  # 1 hour in seconds
+CONFIRMATION_SWEEP_INTERVAL = int(os.getenv("CONFIRMATION_SWEEP_INTERVAL", "60"))  # seconds between expiry checks
+
+# Seconds between syncs of the waiting pools with the database, which pick up imported users (0 disables them)
+POOL_SYNC_INTERVAL = int(os.getenv("POOL_SYNC_INTERVAL", "300"))
@@ -1,21 +1,41 @@
+import asyncio
 import logging
 import os
 from telegram.ext import ApplicationBuilder, CommandHandler, CallbackQueryHandler
 import config
-from src.bot.handlers import start, button_callback, error_handler
+from src.bot.handlers import start, button_callback, error_handler, log_metrics, match_scheduler, sweep_expired_teams, sync_waiting_pool
+from src.bot.webhook import run_webhook
 from src.services.matcher import batch_match_teams
+from src.services.pool import load_waiting_pool
+from src.services.sharding import check_match_mode
+from src.database.schema import upgrade_schema
+from src.logging_setup import configure_logging
 
-# Set up logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
 def main():
     """Start the bot"""
+    # Write the logs from a background thread, off the event loop
+    configure_logging()
+    
+    # Refuse to start with a matching mode that cannot run
+    check_match_mode()
+    
+    # Bring the database schema up to date
+    if config.DB_AUTO_MIGRATE:
+        upgrade_schema()
+    
+    # Load the users still waiting for a team into the matcher's pool
+    pool_size = load_waiting_pool()
+    logger.info("Loaded %d waiting users into the matching pool", pool_size)
+    
     # Create the Application
-    application = ApplicationBuilder().token(config.TELEGRAM_BOT_TOKEN).build()
+    application = (
+        ApplicationBuilder()
+        .token(config.TELEGRAM_BOT_TOKEN)
+        .concurrent_updates(config.UPDATE_WORKERS)
+        .build()
+    )
     
     # Add handlers
     application.add_handler(CommandHandler("start", start))
@@ -24,9 +44,49 @@ def main():
     # Add error handler
     application.add_error_handler(error_handler)
     
+    # Match the users who were already waiting when the bot started
+    match_scheduler.request(application.job_queue)
+    
+    # Return the members of teams that never got confirmed to the pool
+    application.job_queue.run_repeating(
+        sweep_expired_teams,
+        interval=config.CONFIRMATION_SWEEP_INTERVAL,
+        first=config.CONFIRMATION_SWEEP_INTERVAL,
+        name="sweep_expired_teams"
+    )
+    
+    # Pick up the users registered by the import command while the bot runs
+    if config.POOL_SYNC_INTERVAL > 0:
+        application.job_queue.run_repeating(
+            sync_waiting_pool,
+            interval=config.POOL_SYNC_INTERVAL,
+            first=config.POOL_SYNC_INTERVAL,
+            name="sync_waiting_pool"
+        )
+    
+    # Periodically log where the time goes
+    if config.METRICS_LOG_INTERVAL > 0:
+        application.job_queue.run_repeating(
+            log_metrics,
+            interval=config.METRICS_LOG_INTERVAL,
+            first=config.METRICS_LOG_INTERVAL,
+            name="log_metrics"
+        )
+    
     # Start the Bot
-    logger.info("Starting bot with long polling...")
-    application.run_polling()
+    if config.BOT_RUN_MODE == "webhook":
+        logger.info("Starting bot with webhook...")
+        asyncio.run(run_webhook(
+            application,
+            listen=config.WEBHOOK_LISTEN,
+            port=config.WEBHOOK_PORT,
+            path=config.WEBHOOK_PATH,
+            webhook_url=config.WEBHOOK_URL,
+            secret_token=config.WEBHOOK_SECRET_TOKEN
+        ))
+    else:
+        logger.info("Starting bot with long polling...")
+        application.run_polling()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,59 @@
+from logging.config import fileConfig
+import sys
+import os
+
+from alembic import context
+
+# Add the project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config as app_config
+from src.database.models import Base
+from src.database.session import create_db_engine
+
+alembic_config = context.config
+
+if alembic_config.config_file_name is not None and alembic_config.attributes.get("configure_logger", True):
+    fileConfig(alembic_config.config_file_name)
+
+# Metadata used by `alembic revision --autogenerate`
+target_metadata = Base.metadata
+
+def run_migrations_offline():
+    """Emit the migration SQL without connecting to the database"""
+    context.configure(
+        url=app_config.DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=app_config.DATABASE_URL.startswith("sqlite")
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    """Run the migrations against the configured database"""
+    connection = alembic_config.attributes.get("connection")
+    if connection is not None:
+        _run_migrations(connection)
+        return
+
+    engine = create_db_engine(app_config.DATABASE_URL)
+    with engine.connect() as connection:
+        _run_migrations(connection)
+    engine.dispose()
+
+def _run_migrations(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=connection.dialect.name == "sqlite"
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,52 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2024-03-01 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('telegram_id', sa.BigInteger(), nullable=False),
+        sa.Column('username', sa.String(), nullable=True),
+        sa.Column('skill', sa.String(), nullable=False),
+        sa.Column('experience', sa.String(), nullable=False),
+        sa.Column('registration_time', sa.DateTime(), nullable=True),
+        sa.Column('is_waiting', sa.Boolean(), nullable=True),
+        sa.UniqueConstraint('telegram_id'),
+    )
+    op.create_table(
+        'teams',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('is_confirmed', sa.Boolean(), nullable=True),
+        sa.Column('chat_id', sa.BigInteger(), nullable=True),
+    )
+    op.create_table(
+        'team_members',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('team_id', sa.Integer(), sa.ForeignKey('teams.id'), nullable=True),
+        sa.Column('has_confirmed', sa.Boolean(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('team_members')
+    op.drop_table('teams')
+    op.drop_table('users')
@@ -0,0 +1,52 @@
+"""indexes for the matcher and confirmation queries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-03-08 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Partial index predicates, written the way each dialect renders `is_waiting == True`
+WAITING_POSTGRESQL = sa.text('is_waiting = true')
+WAITING_SQLITE = sa.text('is_waiting = 1')
+
+
+def upgrade() -> None:
+    # get_waiting_users(): waiting users in registration order
+    op.create_index(
+        'ix_users_waiting_registration_time',
+        'users',
+        ['registration_time'],
+        postgresql_where=WAITING_POSTGRESQL,
+        sqlite_where=WAITING_SQLITE,
+    )
+    # Waiting users of one skill in registration order
+    op.create_index(
+        'ix_users_waiting_skill_registration_time',
+        'users',
+        ['skill', 'registration_time'],
+        postgresql_where=WAITING_POSTGRESQL,
+        sqlite_where=WAITING_SQLITE,
+    )
+    # get_team_members(), get_team_with_members(), delete_team()
+    op.create_index('ix_team_members_team_id', 'team_members', ['team_id'])
+    # set_member_confirmation(); a user can only be in a team once
+    op.create_index('ix_team_members_user_id_team_id', 'team_members', ['user_id', 'team_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_team_members_user_id_team_id', table_name='team_members')
+    op.drop_index('ix_team_members_team_id', table_name='team_members')
+    op.drop_index('ix_users_waiting_skill_registration_time', table_name='users')
+    op.drop_index('ix_users_waiting_registration_time', table_name='users')
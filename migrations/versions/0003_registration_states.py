@@ -0,0 +1,34 @@
+"""registration conversation state table
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2024-03-15 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'registration_states',
+        sa.Column('telegram_id', sa.BigInteger(), autoincrement=False, nullable=False),
+        sa.Column('data', sa.Text(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('telegram_id'),
+    )
+    op.create_index('ix_registration_states_updated_at', 'registration_states', ['updated_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_registration_states_updated_at', table_name='registration_states')
+    op.drop_table('registration_states')
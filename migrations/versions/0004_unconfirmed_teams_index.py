@@ -0,0 +1,33 @@
+"""index for the confirmation timeout sweeper
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2024-03-22 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Unconfirmed teams by age
+    op.create_index(
+        'ix_teams_unconfirmed_created_at',
+        'teams',
+        ['created_at'],
+        postgresql_where=sa.text('is_confirmed = false'),
+        sqlite_where=sa.text('is_confirmed = 0'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_teams_unconfirmed_created_at', table_name='teams')
@@ -0,0 +1,60 @@
+"""scope users and teams to hackathon events
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2024-04-05 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+WAITING_POSTGRESQL = sa.text('is_waiting = true')
+WAITING_SQLITE = sa.text('is_waiting = 1')
+
+
+def upgrade() -> None:
+    # Existing users and teams belong to the default event
+    op.add_column('users', sa.Column('event_id', sa.String(), nullable=False, server_default='default'))
+    op.add_column('teams', sa.Column('event_id', sa.String(), nullable=False, server_default='default'))
+
+    # The matcher reads the waiting users of one event at a time
+    op.drop_index('ix_users_waiting_skill_registration_time', table_name='users')
+    op.create_index(
+        'ix_users_waiting_event_registration_time',
+        'users',
+        ['event_id', 'registration_time'],
+        postgresql_where=WAITING_POSTGRESQL,
+        sqlite_where=WAITING_SQLITE,
+    )
+    op.create_index(
+        'ix_users_waiting_event_skill_registration_time',
+        'users',
+        ['event_id', 'skill', 'registration_time'],
+        postgresql_where=WAITING_POSTGRESQL,
+        sqlite_where=WAITING_SQLITE,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_waiting_event_skill_registration_time', table_name='users')
+    op.drop_index('ix_users_waiting_event_registration_time', table_name='users')
+    op.create_index(
+        'ix_users_waiting_skill_registration_time',
+        'users',
+        ['skill', 'registration_time'],
+        postgresql_where=WAITING_POSTGRESQL,
+        sqlite_where=WAITING_SQLITE,
+    )
+    with op.batch_alter_table('teams') as batch_op:
+        batch_op.drop_column('event_id')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('event_id')
@@ -0,0 +1,37 @@
+"""count team members and confirmations on the team
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2024-04-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('teams', sa.Column('member_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('teams', sa.Column('confirmed_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Count the members and confirmations of the existing teams
+    op.execute(
+        "UPDATE teams SET "
+        "member_count = (SELECT COUNT(*) FROM team_members WHERE team_members.team_id = teams.id), "
+        "confirmed_count = (SELECT COUNT(*) FROM team_members "
+        "WHERE team_members.team_id = teams.id AND team_members.has_confirmed = true)"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('teams') as batch_op:
+        batch_op.drop_column('confirmed_count')
+        batch_op.drop_column('member_count')
@@ -0,0 +1,109 @@
+"""
+Compact callback data for the inline keyboard buttons.
+
+Buttons carry "<version>:<action code>:<arguments>", e.g. "1:s:spring:0" for the first
+skill of the spring event or "1:c:42:1" to accept team 42, within Telegram's 64 bytes
+whatever the skill names. Skill and experience buttons name their event, so they do not
+depend on conversation state that may have expired. Buttons sent before this schema
+("skill_Design", "confirm_42_yes", ...) are still decoded.
+"""
+
+# Version of the callback data schema, the first field of every button
+CALLBACK_VERSION = "1"
+SEPARATOR = ":"
+
+# Telegram rejects buttons with longer callback data
+MAX_CALLBACK_DATA_BYTES = 64
+
+# Actions
+EDIT_REGISTRATION = "edit_registration"
+CANCEL_EDIT = "cancel_edit"
+SKILL = "skill"
+EXPERIENCE = "experience"
+CONFIRM = "confirm"
+
+_CODES = {EDIT_REGISTRATION: "u", CANCEL_EDIT: "x", SKILL: "s", EXPERIENCE: "e", CONFIRM: "c"}
+_ACTIONS = {code: action for action, code in _CODES.items()}
+
+def _parse_no_arguments(arguments):
+    if arguments is not None:
+        raise ValueError("unexpected arguments")
+    return ()
+
+def _parse_event_option(arguments):
+    # The event comes first and may itself contain the separator; the option index is last
+    event_id, _, index = (arguments or "").rpartition(SEPARATOR)
+    if not event_id:
+        raise ValueError("missing event")
+    return event_id, int(index)
+
+def _parse_confirmation(arguments):
+    team_id, flag = (arguments or "").split(SEPARATOR)
+    if flag not in ("0", "1"):
+        raise ValueError(f"invalid flag {flag!r}")
+    return int(team_id), flag == "1"
+
+# Argument parser of each action
+_PARSERS = {
+    EDIT_REGISTRATION: _parse_no_arguments,
+    CANCEL_EDIT: _parse_no_arguments,
+    SKILL: _parse_event_option,
+    EXPERIENCE: _parse_event_option,
+    CONFIRM: _parse_confirmation,
+}
+
+def encode(action, *args):
+    """
+    Encode a button's action and arguments: (event_id, index) for skills and
+    experience levels, (team_id, accepted) for confirmations.
+    Raises ValueError if the data does not fit in a button.
+    """
+    fields = [CALLBACK_VERSION, _CODES[action]]
+    fields.extend(str(int(arg)) if isinstance(arg, bool) else str(arg) for arg in args)
+    data = SEPARATOR.join(fields)
+    if len(data.encode()) > MAX_CALLBACK_DATA_BYTES:
+        raise ValueError(f"callback data {data!r} is longer than {MAX_CALLBACK_DATA_BYTES} bytes")
+    return data
+
+def decode(data):
+    """
+    Decode the callback data of a pressed button.
+    Returns a tuple (action, args), or None if the data is not understood.
+    Skills and experience levels decode to (event_id, index), or (None, name)
+    for legacy buttons; see resolve_option().
+    """
+    fields = data.split(SEPARATOR, 2)
+    if fields[0] != CALLBACK_VERSION:
+        return _decode_legacy(data)
+
+    action = _ACTIONS.get(fields[1]) if len(fields) > 1 else None
+    if action is None:
+        return None
+    try:
+        return action, _PARSERS[action](fields[2] if len(fields) > 2 else None)
+    except ValueError:
+        return None
+
+def _decode_legacy(data):
+    if data in (EDIT_REGISTRATION, CANCEL_EDIT):
+        return data, ()
+    if data.startswith("skill_"):
+        return SKILL, (None, data[len("skill_"):])
+    if data.startswith("exp_"):
+        return EXPERIENCE, (None, data[len("exp_"):])
+    if data.startswith("confirm_"):
+        try:
+            _, team_id, response = data.split("_")
+            return CONFIRM, (int(team_id), response == "yes")
+        except ValueError:
+            return None
+    return None
+
+def resolve_option(options, value):
+    """
+    Get the option a skill or experience button refers to, by index or by legacy name.
+    Returns None if it is not one of the options.
+    """
+    if isinstance(value, int):
+        return options[value] if 0 <= value < len(options) else None
+    return value if value in options else None
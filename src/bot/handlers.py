@@ -6,37 +6,50 @@ import logging
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-from src.database import operations
-from src.services import matcher, team_manager
-from src.bot import keyboards, messages
+import config
+from src import metrics
+from src.database import async_operations
+from src.services import matcher, pool, team_manager
+from src.bot import callbacks, keyboards, messages
+from src.bot.notifier import dispatcher
+from src.bot.scheduler import MatchScheduler
+from src.bot.state_store import state_store
 
-# Set up logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
-# User state dictionary
-user_states = {}
+def get_requested_event(context):
+    """
+    Get the event requested in the /start command's deep link payload.
+    Returns the event ID, or None if no known event was requested.
+    """
+    args = getattr(context, "args", None)
+    if args and args[0] in config.EVENTS:
+        return args[0]
+    if args:
+        logger.info("Ignoring unknown event code %r", args[0])
+    return None
 
+@metrics.track_update
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle the /start command"""
     try:
-        logger.info(f"Start command received from user {update.effective_user.id}")
-        
         user_id = update.effective_user.id
         username = update.effective_user.username
         
+        # Deep links (t.me/<bot>?start=<event>) pick the hackathon event to register for
+        requested_event = get_requested_event(context)
+        
         # Check if user is already registered
-        logger.info(f"Checking if user {user_id} is registered")
-        existing_user = operations.get_user_by_telegram_id(user_id)
-        logger.info(f"User exists: {existing_user is not None}")
+        existing_user = await async_operations.get_user_by_telegram_id(user_id)
         
         if existing_user:
             # Check if user is already in a team or waiting for confirmation
             is_in_active_team = not existing_user.is_waiting
-            logger.info(f"User is in active team: {is_in_active_team}")
+            logger.info(
+                "Start command from user %s: registered, in active team: %s",
+                user_id, is_in_active_team,
+                extra={"sample": True, "user_id": user_id, "registered": True, "in_active_team": is_in_active_team}
+            )
             
             if is_in_active_team:
                 # User is already in a team or waiting for confirmation, don't allow changes
@@ -46,222 +59,294 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 )
             else:
                 # User is registered but not in a team, allow editing
+                await state_store.set(user_id, {"event": requested_event or existing_user.event_id})
                 await update.message.reply_text(
                     messages.get_already_registered_message(existing_user.skill, existing_user.experience),
                     reply_markup=keyboards.get_edit_registration_keyboard()
                 )
         else:
             # New user, start registration process
-            logger.info(f"Starting registration for new user {user_id}")
-            user_states[user_id] = {"step": "skill_selection"}
+            event_id = requested_event or config.DEFAULT_EVENT
+            await state_store.set(user_id, {"step": "skill_selection", "event": event_id})
             
             # Send welcome message with skill selection keyboard
             await update.message.reply_text(
                 messages.get_welcome_message(),
-                reply_markup=keyboards.get_skill_keyboard()
+                reply_markup=keyboards.get_skill_keyboard(event_id)
+            )
+            logger.info(
+                "Start command from user %s: new user, welcome message sent",
+                user_id,
+                extra={"sample": True, "user_id": user_id, "registered": False, "event_id": event_id}
             )
-            logger.info(f"Welcome message sent to user {user_id}")
     except Exception as e:
-        logger.error(f"Error in start command handler: {e}", exc_info=True)
+        logger.error("Error in start command handler: %s", e, exc_info=True)
         # Try to send a simple message to the user
         try:
             await update.message.reply_text(
                 "Sorry, something went wrong. Please try again later or contact the administrator."
             )
         except Exception as inner_e:
-            logger.error(f"Failed to send error message: {inner_e}")
+            logger.error("Failed to send error message: %s", inner_e)
 
-async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle button callbacks"""
-    query = update.callback_query
+ALREADY_IN_TEAM_MESSAGE = (
+    "You're already part of a team or waiting for team confirmation. "
+    "You cannot change your registration details at this time."
+)
+
+async def handle_edit_registration(query, context):
+    """Restart the registration of a waiting user"""
     user_id = query.from_user.id
-    username = query.from_user.username
-    data = query.data
+
+    # Check if user is already in a team or waiting for confirmation
+    existing_user = await async_operations.get_user_by_telegram_id(user_id)
+    if existing_user and not existing_user.is_waiting:
+        await query.edit_message_text(ALREADY_IN_TEAM_MESSAGE)
+        return
     
-    await query.answer()
+    # Start the registration process again, for the event picked with /start
+    state = await state_store.get(user_id) or {}
+    event_id = state.get("event") or (existing_user.event_id if existing_user else config.DEFAULT_EVENT)
+    await state_store.set(user_id, {"step": "skill_selection", "event": event_id})
     
-    # Handle edit registration request
-    if data == "edit_registration":
-        # Check if user is already in a team or waiting for confirmation
-        existing_user = operations.get_user_by_telegram_id(user_id)
-        if existing_user and not existing_user.is_waiting:
-            await query.edit_message_text(
-                "You're already part of a team or waiting for team confirmation. "
-                "You cannot change your registration details at this time."
-            )
-            return
-        
-        # Start the registration process again
-        user_states[user_id] = {"step": "skill_selection"}
-        
-        # Show skill selection keyboard
-        await query.edit_message_text(
-            "Let's update your registration. Please select your primary skill:",
-            reply_markup=keyboards.get_skill_keyboard()
-        )
+    # Show skill selection keyboard
+    await query.edit_message_text(
+        "Let's update your registration. Please select your primary skill:",
+        reply_markup=keyboards.get_skill_keyboard(event_id)
+    )
+
+async def handle_cancel_edit(query, context):
+    """Keep the existing registration"""
+    await query.edit_message_text(
+        "Registration update cancelled. Your existing registration remains unchanged."
+    )
+
+def get_button_event(event_id, state):
+    """
+    Get the event of a skill or experience button.
+    Legacy buttons carry no event, so it comes from the registration state.
+    Returns the event ID, or None if the event no longer exists.
+    """
+    if event_id is None:
+        return (state or {}).get("event", config.DEFAULT_EVENT)
+    return event_id if event_id in config.EVENTS else None
+
+async def handle_skill(query, context, event_id, skill):
+    """Record the selected skill and ask for the experience level"""
+    user_id = query.from_user.id
+
+    # Check if user is already in a team or waiting for confirmation
+    existing_user = await async_operations.get_user_by_telegram_id(user_id)
+    if existing_user and not existing_user.is_waiting:
+        await query.edit_message_text(ALREADY_IN_TEAM_MESSAGE)
+        return
     
-    # Handle cancel edit request
-    elif data == "cancel_edit":
+    state = await state_store.get(user_id) or {}
+    event_id = get_button_event(event_id, state)
+    if event_id is not None:
+        skill = callbacks.resolve_option(config.get_event_settings(event_id)["required_skills"], skill)
+    if event_id is None or skill is None:
         await query.edit_message_text(
-            "Registration update cancelled. Your existing registration remains unchanged."
+            "Something went wrong. Please start again with /start"
         )
+        return
     
-    # Handle skill selection
-    elif data.startswith("skill_"):
-        # Check if user is already in a team or waiting for confirmation
-        existing_user = operations.get_user_by_telegram_id(user_id)
-        if existing_user and not existing_user.is_waiting:
-            await query.edit_message_text(
-                "You're already part of a team or waiting for team confirmation. "
-                "You cannot change your registration details at this time."
-            )
-            return
-            
-        skill = data.replace("skill_", "")
-        
-        # Update user state
-        if user_id not in user_states:
-            user_states[user_id] = {}
-        user_states[user_id]["skill"] = skill
-        user_states[user_id]["step"] = "experience_selection"
-        
-        # Ask for experience level
+    # Update user state; the button's event wins over a state that expired or was replaced
+    state["event"] = event_id
+    state["skill"] = skill
+    state["step"] = "experience_selection"
+    await state_store.set(user_id, state)
+    
+    # Ask for experience level
+    await query.edit_message_text(
+        messages.get_experience_message(),
+        reply_markup=keyboards.get_experience_keyboard(event_id)
+    )
+
+async def handle_experience(query, context, event_id, experience):
+    """Complete the registration with the selected experience level"""
+    user_id = query.from_user.id
+
+    # Check if user is already in a team or waiting for confirmation
+    existing_user = await async_operations.get_user_by_telegram_id(user_id)
+    if existing_user and not existing_user.is_waiting:
+        await query.edit_message_text(ALREADY_IN_TEAM_MESSAGE)
+        return
+    
+    # Check if user has selected a skill of the button's event
+    state = await state_store.get(user_id)
+    event_id = get_button_event(event_id, state)
+    if event_id is not None:
+        settings = config.get_event_settings(event_id)
+        experience = callbacks.resolve_option(settings["experience_levels"], experience)
+    if (
+        event_id is None or experience is None or not state
+        or state.get("skill") not in settings["required_skills"]
+    ):
         await query.edit_message_text(
-            messages.get_experience_message(),
-            reply_markup=keyboards.get_experience_keyboard()
+            "Something went wrong. Please start again with /start"
         )
+        return
     
-    # Handle experience selection
-    elif data.startswith("exp_"):
-        # Check if user is already in a team or waiting for confirmation
-        existing_user = operations.get_user_by_telegram_id(user_id)
-        if existing_user and not existing_user.is_waiting:
-            await query.edit_message_text(
-                "You're already part of a team or waiting for team confirmation. "
-                "You cannot change your registration details at this time."
-            )
-            return
+    skill = state["skill"]
+    
+    # Check if this is an update to an existing registration
+    is_update = existing_user is not None
+    
+    # Create or update user in database
+    user = await async_operations.run(
+        team_manager.register_user, user_id, query.from_user.username, skill, experience, event_id
+    )
+    await state_store.delete(user_id)
+    if user is None:
+        # Matched into a team since the check above
+        await query.edit_message_text(ALREADY_IN_TEAM_MESSAGE)
+        return
+    
+    # Send confirmation message
+    if is_update:
+        await query.edit_message_text(messages.get_registration_updated_message(skill, experience))
+    else:
+        await query.edit_message_text(messages.get_registration_complete_message(skill, experience))
+    
+    # Queue a matching run; registrations in the same window are matched together
+    match_scheduler.request(context.job_queue)
+
+async def handle_confirm(query, context, team_id, confirmed):
+    """Record a member's answer to a team confirmation request"""
+    is_team_confirmed, team_info = await async_operations.run(
+        team_manager.confirm_team_member, query.from_user.id, team_id, confirmed
+    )
+    
+    if team_info is None:
+        # The team was dissolved, e.g. after the confirmation timeout
+        await query.edit_message_text("This team is no longer available.")
+    elif confirmed:
+        if is_team_confirmed:
+            # All members confirmed, notify them
+            await query.edit_message_text(messages.get_team_confirmed_message())
             
-        experience = data.replace("exp_", "")
-        
-        # Check if user has selected a skill
-        if user_id not in user_states or "skill" not in user_states[user_id]:
-            await query.edit_message_text(
-                "Something went wrong. Please start again with /start"
-            )
-            return
-        
-        skill = user_states[user_id]["skill"]
-        
-        # Check if this is an update to an existing registration
-        is_update = existing_user is not None
-        
-        # Create or update user in database
-        operations.create_user(user_id, username, skill, experience)
-        
-        # Send confirmation message
-        if is_update:
-            await query.edit_message_text(
-                f"✅ Registration updated!\n\n"
-                f"Your skill: {skill}\n"
-                f"Your experience: {experience}\n\n"
-                f"Looking for team members..."
-            )
+            # Create a group chat for the team
+            await create_team_chat(context, team_id, team_info)
         else:
+            # Still waiting for other members
             await query.edit_message_text(
-                f"✅ Registration complete!\n\n"
-                f"Your skill: {skill}\n"
-                f"Your experience: {experience}\n\n"
-                f"Looking for team members..."
+                "Thanks for confirming! Waiting for other team members to confirm..."
             )
+    else:
+        # User declined, notify them
+        await query.edit_message_text(
+            "You've declined the team. You've been added back to the waiting list."
+        )
         
-        # Try to match teams immediately
-        await try_match_teams(context)
+        # The team's members are back in the pool
+        match_scheduler.request(context.job_queue)
+
+# Handler of each callback action, called with the query, the context and the decoded arguments
+CALLBACK_HANDLERS = {
+    callbacks.EDIT_REGISTRATION: handle_edit_registration,
+    callbacks.CANCEL_EDIT: handle_cancel_edit,
+    callbacks.SKILL: handle_skill,
+    callbacks.EXPERIENCE: handle_experience,
+    callbacks.CONFIRM: handle_confirm,
+}
+
+@metrics.track_update
+async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle button callbacks"""
+    query = update.callback_query
+    await query.answer()
     
-    # Handle team confirmation
-    elif data.startswith("confirm_"):
-        _, team_id, response = data.split("_")
-        team_id = int(team_id)
-        confirmed = (response == "yes")
-        
-        # Handle team confirmation
-        is_team_confirmed = team_manager.handle_team_confirmation(user_id, team_id, confirmed)
-        
-        if confirmed:
-            if is_team_confirmed:
-                # All members confirmed, notify them
-                await query.edit_message_text(messages.get_team_confirmed_message())
-                
-                # Create a group chat for the team
-                await create_team_chat(context, team_id)
-            else:
-                # Still waiting for other members
-                await query.edit_message_text(
-                    "Thanks for confirming! Waiting for other team members to confirm..."
-                )
-        else:
-            # User declined, notify them
-            await query.edit_message_text(
-                "You've declined the team. You've been added back to the waiting list."
-            )
+    decoded = callbacks.decode(query.data)
+    if decoded is None:
+        logger.warning("Ignoring unknown callback data %r", query.data)
+        return
+    
+    action, args = decoded
+    await CALLBACK_HANDLERS[action](query, context, *args)
 
 async def try_match_teams(context: ContextTypes.DEFAULT_TYPE):
-    """Try to match teams and notify users"""
-    potential_team = matcher.find_potential_team()
-    
-    if potential_team:
-        # Create a team
-        team = team_manager.create_team_from_users(potential_team)
+    """Match the teams completed by users who joined the waiting pools and notify them"""
+    try:
+        with metrics.timed(metrics.job_latency, job="match_teams"):
+            matched_teams = await async_operations.run(matcher.match_pending_teams)
         
-        # Notify each team member
-        for user in potential_team:
-            try:
-                await context.bot.send_message(
-                    chat_id=user.telegram_id,
-                    text=messages.get_team_match_message(),
-                    reply_markup=keyboards.get_confirmation_keyboard(team.id)
-                )
-            except Exception as e:
-                logger.error(f"Failed to send message to user {user.telegram_id}: {e}")
+        if matched_teams:
+            await notify_matched_teams(context, matched_teams)
+    finally:
+        # Users who became available during the run, or whose run failed, get a run of their own
+        if matcher.incremental_matcher.has_pending():
+            match_scheduler.request(context.job_queue)
+
+# Runs try_match_teams() one at a time, coalescing registrations within MATCH_DEBOUNCE seconds
+match_scheduler = MatchScheduler(try_match_teams, config.MATCH_DEBOUNCE)
+
+async def sync_waiting_pool(context: ContextTypes.DEFAULT_TYPE):
+    """Pick up the waiting users that other processes, such as imports, registered or matched"""
+    with metrics.timed(metrics.job_latency, job="sync_waiting_pool"):
+        added, removed = await async_operations.run(pool.sync_waiting_pool)
+    if added or removed:
+        logger.info("Synced the waiting pool: %d users added, %d removed", added, removed)
+    
+    # New users may complete teams
+    if matcher.incremental_matcher.has_pending():
+        match_scheduler.request(context.job_queue)
 
-async def create_team_chat(context: ContextTypes.DEFAULT_TYPE, team_id):
+async def sweep_expired_teams(context: ContextTypes.DEFAULT_TYPE):
+    """Dissolve teams whose confirmation timed out and notify their members"""
+    with metrics.timed(metrics.job_latency, job="sweep_expired_teams"):
+        expired_teams = await async_operations.run(team_manager.dissolve_expired_teams)
+    if not expired_teams:
+        return
+    
+    logger.info("Dissolved %d teams after the confirmation timeout", len(expired_teams))
+    await dispatcher.send_many(context.bot, [
+        {"chat_id": member["telegram_id"], "text": messages.get_team_expired_message()}
+        for team_info in expired_teams
+        for member in team_info["members"]
+    ])
+    
+    # The members are back in the pool
+    match_scheduler.request(context.job_queue)
+
+async def log_metrics(context: ContextTypes.DEFAULT_TYPE):
+    """Write a summary of the metrics to the log"""
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Metrics: %s", metrics.registry.summary())
+
+async def notify_matched_teams(context: ContextTypes.DEFAULT_TYPE, matched_teams):
+    """Ask the members of newly matched teams to confirm, all teams at once"""
+    await dispatcher.send_many(context.bot, [
+        {
+            "chat_id": user.telegram_id,
+            "text": messages.get_team_match_message(),
+            "reply_markup": keyboards.get_confirmation_keyboard(team_id)
+        }
+        for team_id, team_members in matched_teams
+        for user in team_members
+    ])
+
+async def create_team_chat(context: ContextTypes.DEFAULT_TYPE, team_id, team_info=None):
     """Notify team members about their teammates"""
-    team_info = team_manager.get_team_info(team_id)
+    if team_info is None:
+        team_info = await async_operations.run(team_manager.get_team_info, team_id)
     
     if not team_info or not team_info["is_confirmed"]:
         return
     
     try:
-        # For each team member, send them information about their teammates
-        for member in team_info["members"]:
-            # Get this member's teammates (everyone except themselves)
-            teammates = [m for m in team_info["members"] if m["telegram_id"] != member["telegram_id"]]
-            
-            # Create a message with teammate information
-            message = "🎉 Your hackathon team is confirmed! 🎉\n\n"
-            message += "Here are your teammates:\n\n"
-            
-            for teammate in teammates:
-                username = teammate["username"] or "No username"
-                message += f"• @{username} - {teammate['skill']} ({teammate['experience']})\n"
-            
-            message += "\nWe recommend creating a group chat with your teammates to coordinate your hackathon project. Good luck! 🚀"
-            
-            # Send the message to this team member
-            try:
-                await context.bot.send_message(
-                    chat_id=member["telegram_id"],
-                    text=message
-                )
-            except Exception as e:
-                logger.error(f"Failed to notify user {member['telegram_id']}: {e}")
+        # Tell each team member who their teammates are
+        notifications = [
+            {"chat_id": telegram_id, "text": message}
+            for telegram_id, message in messages.get_teammates_messages(team_info)
+        ]
         
-        # Mark the team as confirmed in the database
-        operations.set_team_confirmation(team_id, True)
+        # Send the messages to all team members concurrently
+        await dispatcher.send_many(context.bot, notifications)
         
     except Exception as e:
-        logger.error(f"Failed to notify team members: {e}")
+        logger.error("Failed to notify team members: %s", e)
 
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Log errors caused by updates"""
-    logger.error(f"Update {update} caused error {context.error}")
+    logger.error("Update %s caused error %s", update, context.error)
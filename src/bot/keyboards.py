@@ -1,3 +1,4 @@
+from functools import lru_cache
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 import sys
 import os
@@ -5,35 +6,62 @@ import os
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 import config
+from src.bot import callbacks
 
-def get_skill_keyboard():
-    """
-    Create an inline keyboard for skill selection.
-    """
+# Keyboards of recent teams, shared by the confirmation requests sent to their members
+CONFIRMATION_KEYBOARD_CACHE_SIZE = 1024
+
+# Telegram objects are immutable, so every keyboard is built once and shared by all updates
+
+def _build_skill_keyboard(event_id):
     keyboard = []
-    for skill in config.REQUIRED_SKILLS:
-        keyboard.append([InlineKeyboardButton(skill, callback_data=f"skill_{skill}")])
+    for index, skill in enumerate(config.get_event_settings(event_id)["required_skills"]):
+        keyboard.append([InlineKeyboardButton(skill, callback_data=callbacks.encode(callbacks.SKILL, event_id, index))])
     
     return InlineKeyboardMarkup(keyboard)
 
-def get_experience_keyboard():
-    """
-    Create an inline keyboard for experience selection.
-    """
+def _build_experience_keyboard(event_id):
     keyboard = []
-    for experience in config.EXPERIENCE_LEVELS:
-        keyboard.append([InlineKeyboardButton(experience, callback_data=f"exp_{experience}")])
+    for index, experience in enumerate(config.get_event_settings(event_id)["experience_levels"]):
+        keyboard.append([InlineKeyboardButton(experience, callback_data=callbacks.encode(callbacks.EXPERIENCE, event_id, index))])
     
     return InlineKeyboardMarkup(keyboard)
 
+_skill_keyboards = {event_id: _build_skill_keyboard(event_id) for event_id in config.EVENTS}
+_experience_keyboards = {event_id: _build_experience_keyboard(event_id) for event_id in config.EVENTS}
+
+EDIT_REGISTRATION_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("✏️ Update Registration", callback_data=callbacks.encode(callbacks.EDIT_REGISTRATION))],
+    [InlineKeyboardButton("❌ Cancel", callback_data=callbacks.encode(callbacks.CANCEL_EDIT))]
+])
+
+def get_skill_keyboard(event_id=config.DEFAULT_EVENT):
+    """
+    Get the inline keyboard for skill selection, built once per event.
+    """
+    keyboard = _skill_keyboards.get(event_id)
+    if keyboard is None:
+        keyboard = _skill_keyboards[event_id] = _build_skill_keyboard(event_id)
+    return keyboard
+
+def get_experience_keyboard(event_id=config.DEFAULT_EVENT):
+    """
+    Get the inline keyboard for experience selection, built once per event.
+    """
+    keyboard = _experience_keyboards.get(event_id)
+    if keyboard is None:
+        keyboard = _experience_keyboards[event_id] = _build_experience_keyboard(event_id)
+    return keyboard
+
+@lru_cache(maxsize=CONFIRMATION_KEYBOARD_CACHE_SIZE)
 def get_confirmation_keyboard(team_id):
     """
-    Create an inline keyboard for team confirmation.
+    Get the inline keyboard for team confirmation, built once per team.
     """
     keyboard = [
         [
-            InlineKeyboardButton("✅ Accept", callback_data=f"confirm_{team_id}_yes"),
-            InlineKeyboardButton("❌ Decline", callback_data=f"confirm_{team_id}_no")
+            InlineKeyboardButton("✅ Accept", callback_data=callbacks.encode(callbacks.CONFIRM, team_id, True)),
+            InlineKeyboardButton("❌ Decline", callback_data=callbacks.encode(callbacks.CONFIRM, team_id, False))
         ]
     ]
     
@@ -41,11 +69,6 @@ def get_confirmation_keyboard(team_id):
 
 def get_edit_registration_keyboard():
     """
-    Create an inline keyboard for editing registration.
+    Get the inline keyboard for editing registration.
     """
-    keyboard = [
-        [InlineKeyboardButton("✏️ Update Registration", callback_data="edit_registration")],
-        [InlineKeyboardButton("❌ Cancel", callback_data="cancel_edit")]
-    ]
-    
-    return InlineKeyboardMarkup(keyboard)
+    return EDIT_REGISTRATION_KEYBOARD
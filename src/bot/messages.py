@@ -1,81 +1,150 @@
+# Messages are built once at import; the ones with details are compiled str.format templates
+
+WELCOME_MESSAGE = (
+    "👋 Welcome to the Hackathon Team Matching Bot!\n\n"
+    "This bot will help you find teammates for the hackathon based on your skills and experience.\n\n"
+    "Let's get started! Please select your primary skill:"
+)
+
+EXPERIENCE_MESSAGE = "Great! Now, please select your experience level:"
+
+TEAM_MATCH_MESSAGE = (
+    "🎉 You've been matched with a team!\n\n"
+    "Do you accept this team assignment? If all team members accept, "
+    "we'll create a group chat for your team."
+)
+
+TEAM_CONFIRMED_MESSAGE = (
+    "✅ Your team has been confirmed!\n\n"
+    "All members have accepted the team assignment. "
+    "You'll be added to a group chat shortly."
+)
+
+TEAM_DECLINED_MESSAGE = (
+    "❌ Unfortunately, someone declined the team assignment.\n\n"
+    "You've been added back to the waiting list. "
+    "We'll notify you when we find a new team for you."
+)
+
+TEAM_EXPIRED_MESSAGE = (
+    "⌛ Your team assignment expired because not every member confirmed in time.\n\n"
+    "You've been added back to the waiting list. "
+    "We'll notify you when we find a new team for you."
+)
+
+_format_registration = (
+    "✅ Registration {status}!\n\n"
+    "Your skill: {skill}\n"
+    "Your experience: {experience}\n\n"
+    "Looking for team members..."
+).format
+
+_format_already_registered = (
+    "You're already registered with the following details:\n\n"
+    "Skill: {skill}\n"
+    "Experience: {experience}\n\n"
+    "Would you like to update your registration?"
+).format
+
+_TEAM_INTRO_HEADER = "🚀 Welcome to your hackathon team chat! 🚀\n\nHere are your team members:\n\n"
+_TEAM_INTRO_FOOTER = "\nGood luck with your hackathon project! 🎉"
+_format_intro_member = "• {username} - {skill} ({experience})\n".format
+
+_TEAMMATES_HEADER = "🎉 Your hackathon team is confirmed! 🎉\n\nHere are your teammates:\n\n"
+_TEAMMATES_FOOTER = (
+    "\nWe recommend creating a group chat with your teammates to coordinate your hackathon project. Good luck! 🚀"
+)
+_format_teammate = "• @{username} - {skill} ({experience})\n".format
+
 def get_welcome_message():
     """
     Get the welcome message for new users.
     """
-    return (
-        "👋 Welcome to the Hackathon Team Matching Bot!\n\n"
-        "This bot will help you find teammates for the hackathon based on your skills and experience.\n\n"
-        "Let's get started! Please select your primary skill:"
-    )
+    return WELCOME_MESSAGE
 
 def get_experience_message():
     """
     Get the message asking for experience level.
     """
-    return "Great! Now, please select your experience level:"
+    return EXPERIENCE_MESSAGE
 
 def get_registration_complete_message(skill, experience):
     """
     Get the message confirming registration is complete.
     """
-    return (
-        f"✅ Registration complete!\n\n"
-        f"Your skill: {skill}\n"
-        f"Your experience: {experience}\n\n"
-        f"Looking for team members..."
-    )
+    return _format_registration(status="complete", skill=skill, experience=experience)
+
+def get_registration_updated_message(skill, experience):
+    """
+    Get the message confirming a registration was updated.
+    """
+    return _format_registration(status="updated", skill=skill, experience=experience)
 
 def get_team_match_message():
     """
     Get the message notifying users they've been matched with a team.
     """
-    return (
-        "🎉 You've been matched with a team!\n\n"
-        "Do you accept this team assignment? If all team members accept, "
-        "we'll create a group chat for your team."
-    )
+    return TEAM_MATCH_MESSAGE
 
 def get_team_confirmed_message():
     """
     Get the message notifying users their team has been confirmed.
     """
-    return (
-        "✅ Your team has been confirmed!\n\n"
-        "All members have accepted the team assignment. "
-        "You'll be added to a group chat shortly."
-    )
+    return TEAM_CONFIRMED_MESSAGE
 
 def get_team_declined_message():
     """
     Get the message notifying users someone declined the team.
     """
-    return (
-        "❌ Unfortunately, someone declined the team assignment.\n\n"
-        "You've been added back to the waiting list. "
-        "We'll notify you when we find a new team for you."
-    )
+    return TEAM_DECLINED_MESSAGE
+
+def get_team_expired_message():
+    """
+    Get the message notifying users their team expired before everyone confirmed.
+    """
+    return TEAM_EXPIRED_MESSAGE
 
 def get_team_intro_message(team_info):
     """
     Get the introduction message for a new team chat.
     """
-    message = "🚀 Welcome to your hackathon team chat! 🚀\n\n"
-    message += "Here are your team members:\n\n"
-    
-    for member in team_info["members"]:
-        username = member["username"] or "Anonymous"
-        message += f"• {username} - {member['skill']} ({member['experience']})\n"
-    
-    message += "\nGood luck with your hackathon project! 🎉"
-    return message
+    return "".join([
+        _TEAM_INTRO_HEADER,
+        *(
+            _format_intro_member(
+                username=member["username"] or "Anonymous",
+                skill=member["skill"],
+                experience=member["experience"]
+            )
+            for member in team_info["members"]
+        ),
+        _TEAM_INTRO_FOOTER,
+    ])
+
+def get_teammates_messages(team_info):
+    """
+    Get the message telling each member of a confirmed team who their teammates are.
+    Returns a list of (telegram_id, message) tuples, one per member.
+    """
+    # Each member's line is formatted once and reused in their teammates' messages
+    lines = [
+        _format_teammate(
+            username=member["username"] or "No username",
+            skill=member["skill"],
+            experience=member["experience"]
+        )
+        for member in team_info["members"]
+    ]
+    return [
+        (
+            member["telegram_id"],
+            "".join([_TEAMMATES_HEADER, *lines[:index], *lines[index + 1:], _TEAMMATES_FOOTER])
+        )
+        for index, member in enumerate(team_info["members"])
+    ]
 
 def get_already_registered_message(skill, experience):
     """
     Get the message for users who are already registered.
     """
-    return (
-        f"You're already registered with the following details:\n\n"
-        f"Skill: {skill}\n"
-        f"Experience: {experience}\n\n"
-        f"Would you like to update your registration?"
-    )
+    return _format_already_registered(skill=skill, experience=experience)
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+import sys
+import os
+
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+import config
+from src import metrics
+
+logger = logging.getLogger(__name__)
+
+# Number of per-chat rate limiters kept in memory
+MAX_CHAT_BUCKETS = 10000
+
+class TokenBucket:
+    """
+    Token bucket rate limiter for coroutines.
+    Allows `rate` acquisitions per second on average, with bursts of up to `capacity`.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = None
+
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        # Created lazily so the lock belongs to the running event loop
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class NotificationDispatcher:
+    """
+    Sends Telegram messages concurrently while staying under the global and
+    per-chat rate limits. Flood-control errors pause every send for the time
+    Telegram asks for; network errors are retried with exponential backoff.
+    """
+
+    def __init__(self, global_rate, per_chat_rate, max_retries, backoff=0.5):
+        self.per_chat_rate = per_chat_rate
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._global_bucket = TokenBucket(global_rate)
+        self._chat_buckets = OrderedDict()
+        self._paused_until = 0
+        self.pending = 0
+
+    async def send(self, bot, chat_id, text, **kwargs):
+        """
+        Send a message to a chat, retrying on flood control and network errors.
+        Returns True if the message was sent, False otherwise.
+        """
+        self.pending += 1
+        try:
+            sent = await self._send(bot, chat_id, text, **kwargs)
+        finally:
+            self.pending -= 1
+        metrics.notifications.inc(result="sent" if sent else "failed")
+        return sent
+
+    async def _send(self, bot, chat_id, text, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_turn(chat_id)
+            try:
+                with metrics.timed(metrics.telegram_send_latency):
+                    await bot.send_message(chat_id=chat_id, text=text, **kwargs)
+                return True
+            except RetryAfter as e:
+                logger.warning("Flood control hit, pausing notifications for %ss", e.retry_after)
+                self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+            except BadRequest as e:
+                logger.error("Failed to send message to user %s: %s", chat_id, e)
+                return False
+            except NetworkError as e:
+                delay = self.backoff * (2 ** attempt)
+                logger.warning("Network error sending to user %s, retrying in %ss: %s", chat_id, delay, e)
+                await asyncio.sleep(delay)
+            except Exception as e:
+                logger.error("Failed to send message to user %s: %s", chat_id, e)
+                return False
+
+        logger.error("Giving up on message to user %s after %d attempts", chat_id, self.max_retries + 1)
+        return False
+
+    async def send_many(self, bot, notifications):
+        """
+        Send several messages concurrently.
+        Each notification is a dictionary of send_message() arguments with at least chat_id and text.
+        Returns a list of booleans telling which messages were sent.
+        """
+        return await asyncio.gather(*(
+            self.send(bot, **notification) for notification in notifications
+        ))
+
+    async def _wait_for_turn(self, chat_id):
+        await self._chat_bucket(chat_id).acquire()
+        await self._global_bucket.acquire()
+
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.per_chat_rate, capacity=1)
+            self._chat_buckets[chat_id] = bucket
+            if len(self._chat_buckets) > MAX_CHAT_BUCKETS:
+                self._chat_buckets.popitem(last=False)
+        else:
+            self._chat_buckets.move_to_end(chat_id)
+        return bucket
+
+
+# Process-wide dispatcher used by the handlers
+dispatcher = NotificationDispatcher(
+    global_rate=config.NOTIFY_GLOBAL_RATE,
+    per_chat_rate=config.NOTIFY_PER_CHAT_RATE,
+    max_retries=config.NOTIFY_MAX_RETRIES
+)
+
+metrics.registry.gauge(
+    "notifications_pending", "Notifications waiting for their turn or being sent",
+    lambda: dispatcher.pending
+)
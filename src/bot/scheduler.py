@@ -0,0 +1,34 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class MatchScheduler:
+    """
+    Runs the matching job on the application's JobQueue, one run at a time.
+    Requests made while a run is already scheduled are coalesced into it, so a
+    burst of registrations costs a single matching run per debounce window.
+    """
+
+    def __init__(self, callback, debounce):
+        self.callback = callback
+        self.debounce = debounce
+        self._scheduled = False
+        self._lock = None
+
+    def request(self, job_queue):
+        """Schedule a matching run unless one is already waiting to start"""
+        if self._scheduled:
+            return
+        self._scheduled = True
+        job_queue.run_once(self._run, self.debounce, name="match_teams")
+
+    async def _run(self, context):
+        # Created lazily so the lock belongs to the running event loop
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        # Requests arriving from now on need a new run to see their users
+        self._scheduled = False
+        async with self._lock:
+            await self.callback(context)
@@ -0,0 +1,97 @@
+import json
+import time
+from collections import OrderedDict
+import sys
+import os
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+import config
+from src.database import async_operations, operations
+
+class MemoryStateStore:
+    """
+    Registration state kept in this process.
+    Entries expire after `ttl` seconds and the least recently used entries are
+    evicted once more than `max_entries` users are mid-registration.
+    """
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    async def get(self, user_id):
+        """Get a user's state, or None if there is none or it expired"""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+
+        expires_at, state = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            return None
+
+        self._entries.move_to_end(user_id)
+        return dict(state)
+
+    async def set(self, user_id, state):
+        """Store a user's state"""
+        self._entries[user_id] = (time.monotonic() + self.ttl, dict(state))
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, user_id):
+        """Forget a user's state"""
+        self._entries.pop(user_id, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DatabaseStateStore:
+    """
+    Registration state kept in the registration_states table, so it survives
+    restarts and is shared between replicas. Expired and excess rows are purged
+    every `purge_interval` writes.
+    """
+
+    def __init__(self, ttl, max_entries, purge_interval=100):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.purge_interval = purge_interval
+        self._writes = 0
+
+    async def get(self, user_id):
+        """Get a user's state, or None if there is none or it expired"""
+        data = await async_operations.run(operations.get_registration_state, user_id, self.ttl)
+        return json.loads(data) if data else None
+
+    async def set(self, user_id, state):
+        """Store a user's state"""
+        await async_operations.run(operations.save_registration_state, user_id, json.dumps(state))
+
+        self._writes += 1
+        if self._writes % self.purge_interval == 0:
+            await async_operations.run(operations.purge_registration_states, self.ttl, self.max_entries)
+
+    async def delete(self, user_id):
+        """Forget a user's state"""
+        await async_operations.run(operations.delete_registration_state, user_id)
+
+
+def create_state_store():
+    """
+    Create the registration state store selected by config.STATE_STORE.
+    Returns a state store.
+    """
+    if config.STATE_STORE == "database":
+        return DatabaseStateStore(config.STATE_TTL, config.STATE_MAX_ENTRIES)
+    if config.STATE_STORE == "memory":
+        return MemoryStateStore(config.STATE_TTL, config.STATE_MAX_ENTRIES)
+    raise ValueError(f"Unknown STATE_STORE: {config.STATE_STORE}")
+
+
+# Process-wide store used by the registration flow
+state_store = create_state_store()
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import logging
+import signal
+
+import tornado.web
+from telegram import Update
+
+from src import metrics
+
+logger = logging.getLogger(__name__)
+
+class TelegramWebhookHandler(tornado.web.RequestHandler):
+    """Receive updates pushed by Telegram and queue them for the application"""
+
+    def initialize(self, bot_application, secret_token):
+        self.bot_application = bot_application
+        self.secret_token = secret_token
+
+    async def post(self):
+        if self.secret_token and self.request.headers.get("X-Telegram-Bot-Api-Secret-Token") != self.secret_token:
+            self.send_error(403)
+            return
+
+        try:
+            update = Update.de_json(json.loads(self.request.body), self.bot_application.bot)
+        except Exception as e:
+            logger.warning("Invalid webhook payload: %s", e)
+            self.send_error(400)
+            return
+
+        await self.bot_application.update_queue.put(update)
+        self.set_status(200)
+
+
+class HealthHandler(tornado.web.RequestHandler):
+    """Report that the bot process is up"""
+
+    def initialize(self, bot_application):
+        self.bot_application = bot_application
+
+    def get(self):
+        self.write({"status": "ok" if self.bot_application.running else "starting"})
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    """Expose the process's metrics in the Prometheus text format"""
+
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.write(metrics.registry.render())
+
+
+def build_webhook_app(application, path, secret_token=None):
+    """
+    Build the HTTP application serving the webhook, health and metrics endpoints.
+    Returns a tornado application.
+    """
+    return tornado.web.Application([
+        (path, TelegramWebhookHandler, {"bot_application": application, "secret_token": secret_token}),
+        (r"/health", HealthHandler, {"bot_application": application}),
+        (r"/metrics", MetricsHandler),
+    ])
+
+async def run_webhook(application, listen, port, path, webhook_url, secret_token=None):
+    """Serve updates over HTTP until the process is asked to stop"""
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for stop_signal in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(stop_signal, stop_event.set)
+
+    server = build_webhook_app(application, path, secret_token).listen(port, address=listen)
+    try:
+        async with application:
+            await application.start()
+            await application.bot.set_webhook(
+                url=webhook_url.rstrip("/") + path,
+                secret_token=secret_token,
+                allowed_updates=Update.ALL_TYPES
+            )
+            logger.info("Webhook server listening on %s:%s%s", listen, port, path)
+
+            await stop_event.wait()
+
+            await application.stop()
+    finally:
+        server.stop()
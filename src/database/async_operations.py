@@ -0,0 +1,28 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from src.database import operations
+from src import metrics
+import config
+
+# Bounded pool of threads for blocking database work, so queries never run on the event loop
+executor = ThreadPoolExecutor(
+    max_workers=config.DB_EXECUTOR_WORKERS,
+    thread_name_prefix="db"
+)
+
+async def run(func, *args, **kwargs):
+    """Run a blocking database function in the database executor"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    with metrics.timed(metrics.db_operation_latency, operation=func.__name__):
+        return await loop.run_in_executor(executor, call)
+
+# Operations awaited directly by the handlers; anything that also updates the waiting
+# pool or the caches goes through the services with run()
+async def get_user_by_telegram_id(telegram_id):
+    """Get a user by their Telegram ID"""
+    return await run(operations.get_user_by_telegram_id, telegram_id)
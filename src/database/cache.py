@@ -0,0 +1,184 @@
+import threading
+import time
+from collections import OrderedDict
+
+import config
+
+# Returned by UserCache.get() when the Telegram ID is not cached
+MISSING = object()
+
+class UserCache:
+    """
+    Read-through cache of users keyed by Telegram ID, with TTL and LRU eviction.
+    Unregistered Telegram IDs are cached as None. Every write to a user must
+    invalidate it, by Telegram ID or by user ID, before and after it commits.
+    A read passes the generation it started at to put(), so a row read before
+    an invalidation is not cached after it.
+    """
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._telegram_ids = {}
+        self._lock = threading.Lock()
+
+    def get(self, telegram_id):
+        """Get a cached user, None for a cached unknown user, or MISSING"""
+        with self._lock:
+            entry = self._entries.get(telegram_id)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._discard(telegram_id)
+                self.misses += 1
+                return MISSING
+
+            self._entries.move_to_end(telegram_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, telegram_id, user, generation=None):
+        """
+        Cache a user, or None if the Telegram ID is not registered.
+        Nothing is cached if the cache was invalidated since the given generation.
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._discard(telegram_id)
+            self._entries[telegram_id] = (time.monotonic() + self.ttl, user)
+            if user is not None:
+                self._telegram_ids[user.id] = telegram_id
+            while len(self._entries) > self.max_entries:
+                oldest_telegram_id = next(iter(self._entries))
+                self._discard(oldest_telegram_id)
+
+    def invalidate(self, telegram_id):
+        """Drop a user from the cache by Telegram ID"""
+        with self._lock:
+            self.generation += 1
+            self._discard(telegram_id)
+
+    def invalidate_user_ids(self, user_ids):
+        """Drop users from the cache by database ID"""
+        with self._lock:
+            self.generation += 1
+            for user_id in user_ids:
+                telegram_id = self._telegram_ids.get(user_id)
+                if telegram_id is not None:
+                    self._discard(telegram_id)
+
+    def clear(self):
+        """Drop every user from the cache"""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._telegram_ids.clear()
+
+    def stats(self):
+        """
+        Get the cache counters.
+        Returns a dictionary with hits, misses and size.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _discard(self, telegram_id):
+        entry = self._entries.pop(telegram_id, None)
+        if entry is not None and entry[1] is not None:
+            self._telegram_ids.pop(entry[1].id, None)
+
+
+# Process-wide cache used by operations.get_user_by_telegram_id()
+user_cache = UserCache(config.USER_CACHE_TTL, config.USER_CACHE_SIZE)
+
+class TeamCache:
+    """
+    Snapshots of teams waiting for confirmation, keyed by team ID, with LRU eviction.
+    A snapshot is a team information dictionary whose members carry their user_id
+    and has_confirmed flag. Confirmation writes update it in place; teams that are
+    confirmed, deleted or dissolved are evicted.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, team_id):
+        """Get a copy of a cached team snapshot, or None"""
+        with self._lock:
+            snapshot = self._entries.get(team_id)
+            if snapshot is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(team_id)
+            self.hits += 1
+            return _copy_snapshot(snapshot)
+
+    def put(self, snapshot):
+        """Cache a copy of a team snapshot"""
+        with self._lock:
+            self._entries[snapshot["team_id"]] = _copy_snapshot(snapshot)
+            self._entries.move_to_end(snapshot["team_id"])
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def set_member_confirmation(self, team_id, user_id, has_confirmed):
+        """
+        Update a member's confirmation flag in a cached team.
+        Returns True if the team and the member are cached, False otherwise.
+        """
+        with self._lock:
+            snapshot = self._entries.get(team_id)
+            if snapshot is None:
+                return False
+
+            for member in snapshot["members"]:
+                if member["user_id"] == user_id:
+                    member["has_confirmed"] = has_confirmed
+                    return True
+            return False
+
+    def invalidate(self, team_id):
+        """Drop a team from the cache"""
+        with self._lock:
+            self._entries.pop(team_id, None)
+
+    def invalidate_many(self, team_ids):
+        """Drop several teams from the cache"""
+        with self._lock:
+            for team_id in team_ids:
+                self._entries.pop(team_id, None)
+
+    def clear(self):
+        """Drop every team from the cache"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Get the cache counters.
+        Returns a dictionary with hits, misses and size.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def __len__(self):
+        return len(self._entries)
+
+def _copy_snapshot(snapshot):
+    return dict(snapshot, members=[dict(member) for member in snapshot["members"]])
+
+
+# Process-wide cache of the teams in a confirmation round, like the waiting pool
+team_cache = TeamCache(config.TEAM_CACHE_SIZE)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, BigInteger, String, Boolean, ForeignKey, DateTime, create_engine
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Boolean, ForeignKey, DateTime, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -16,6 +16,7 @@ class User(Base):
     
     id = Column(Integer, primary_key=True)
     telegram_id = Column(BigInteger, unique=True, nullable=False)
+    event_id = Column(String, nullable=False, default=config.DEFAULT_EVENT, server_default="default")
     username = Column(String, nullable=True)
     skill = Column(String, nullable=False)
     experience = Column(String, nullable=False)
@@ -25,23 +26,53 @@ class User(Base):
     # Relationships
     team_memberships = relationship("TeamMember", back_populates="user")
     
+    __table_args__ = (
+        # Waiting users in registration order (get_waiting_users)
+        Index(
+            "ix_users_waiting_registration_time", registration_time,
+            postgresql_where=(is_waiting == True), sqlite_where=(is_waiting == True)
+        ),
+        # Waiting users of one event in registration order
+        Index(
+            "ix_users_waiting_event_registration_time", event_id, registration_time,
+            postgresql_where=(is_waiting == True), sqlite_where=(is_waiting == True)
+        ),
+        # Waiting users of one skill in an event, in registration order
+        Index(
+            "ix_users_waiting_event_skill_registration_time", event_id, skill, registration_time,
+            postgresql_where=(is_waiting == True), sqlite_where=(is_waiting == True)
+        ),
+    )
+    
     def __repr__(self):
-        return f"<User(telegram_id={self.telegram_id}, skill={self.skill})>"
+        return f"<User(telegram_id={self.telegram_id}, event_id={self.event_id}, skill={self.skill})>"
 
 
 class Team(Base):
     __tablename__ = "teams"
     
     id = Column(Integer, primary_key=True)
+    event_id = Column(String, nullable=False, default=config.DEFAULT_EVENT, server_default="default")
     created_at = Column(DateTime, default=datetime.utcnow)
     is_confirmed = Column(Boolean, default=False)
     chat_id = Column(BigInteger, nullable=True)
+    # Kept in step with team_members, so a confirmation is counted without reading the members
+    member_count = Column(Integer, nullable=False, default=0, server_default="0")
+    confirmed_count = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relationships
-    members = relationship("TeamMember", back_populates="team")
+    members = relationship("TeamMember", back_populates="team", order_by="TeamMember.id")
+    
+    __table_args__ = (
+        # Unconfirmed teams by age (confirmation timeout sweeper)
+        Index(
+            "ix_teams_unconfirmed_created_at", created_at,
+            postgresql_where=(is_confirmed == False), sqlite_where=(is_confirmed == False)
+        ),
+    )
     
     def __repr__(self):
-        return f"<Team(id={self.id}, is_confirmed={self.is_confirmed})>"
+        return f"<Team(id={self.id}, event_id={self.event_id}, is_confirmed={self.is_confirmed})>"
 
 
 class TeamMember(Base):
@@ -56,13 +87,21 @@ class TeamMember(Base):
     user = relationship("User", back_populates="team_memberships")
     team = relationship("Team", back_populates="members")
     
+    __table_args__ = (
+        Index("ix_team_members_team_id", team_id),
+        Index("ix_team_members_user_id_team_id", user_id, team_id, unique=True),
+    )
+    
     def __repr__(self):
         return f"<TeamMember(user_id={self.user_id}, team_id={self.team_id}, has_confirmed={self.has_confirmed})>"
 
 
-# Initialize database
-engine = create_engine(config.DATABASE_URL)
-
-# Drop all tables and recreate them
-Base.metadata.drop_all(engine)
-Base.metadata.create_all(engine)
+class RegistrationState(Base):
+    __tablename__ = "registration_states"
+    
+    telegram_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    data = Column(Text, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<RegistrationState(telegram_id={self.telegram_id}, updated_at={self.updated_at})>"
@@ -1,149 +1,401 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, scoped_session
-from datetime import datetime
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import joinedload, selectinload
+from datetime import datetime, timedelta
 
-from src.database.models import Base, User, Team, TeamMember
+from src.database.models import User, Team, TeamMember, RegistrationState
+from src.database.session import after_commit, in_unit_of_work, unit_of_work
+from src.database.cache import MISSING, team_cache, user_cache
 import config
 
-# Create database engine and session
-engine = create_engine(config.DATABASE_URL)
-SessionLocal = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+# Maximum number of IDs bound in a single IN (...) clause
+BULK_CHUNK_SIZE = 5000
 
-# Ensure tables exist
-Base.metadata.create_all(bind=engine)
-
-def get_db():
-    """Get database session"""
-    db = SessionLocal()
-    try:
-        return db
-    finally:
-        db.close()
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
 
 # User operations
-def create_user(telegram_id, username, skill, experience):
-    """Create a new user in the database"""
-    db = get_db()
-    
-    # Check if user already exists
-    existing_user = db.query(User).filter(User.telegram_id == telegram_id).first()
-    if existing_user:
-        existing_user.skill = skill
-        existing_user.experience = experience
-        existing_user.is_waiting = True
-        db.commit()
-        return existing_user
-    
-    # Create new user
-    user = User(
-        telegram_id=telegram_id,
-        username=username,
-        skill=skill,
-        experience=experience,
-        registration_time=datetime.utcnow(),
-        is_waiting=True
-    )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+def invalidate_users(telegram_ids=(), user_ids=()):
+    """
+    Drop users from the user cache now and again once the current unit of work commits,
+    so a read from another thread in between cannot cache the rows as they were.
+    Call it inside the unit of work that writes the users: outside of one, the second
+    invalidation would run right away instead of after the commit.
+    """
+    telegram_ids = list(telegram_ids)
+    user_ids = list(user_ids)
+
+    def invalidate():
+        for telegram_id in telegram_ids:
+            user_cache.invalidate(telegram_id)
+        if user_ids:
+            user_cache.invalidate_user_ids(user_ids)
+
+    invalidate()
+    after_commit(invalidate)
 
-def get_waiting_users():
-    """Get all users who are waiting for a team"""
-    db = get_db()
-    return db.query(User).filter(User.is_waiting == True).order_by(User.registration_time).all()
+def create_user(telegram_id, username, skill, experience, event_id=config.DEFAULT_EVENT):
+    """
+    Create a new user in the database, or update the registration of a waiting user.
+    Returns the user, or None if the user is already in a team.
+    """
+    with unit_of_work() as db:
+        invalidate_users(telegram_ids=[telegram_id])
+        # Update the user in place if they already exist and are still waiting;
+        # the guard keeps a user matched since the caller's check on their team
+        existing_user = db.execute(
+            update(User)
+            .where(User.telegram_id == telegram_id, User.is_waiting == True)
+            .values(skill=skill, experience=experience, event_id=event_id)
+            .returning(User)
+        ).scalars().first()
+        if existing_user:
+            return existing_user
+        if db.execute(select(User.id).where(User.telegram_id == telegram_id)).first() is not None:
+            return None
+
+        # Create new user
+        user = User(
+            telegram_id=telegram_id,
+            username=username,
+            event_id=event_id,
+            skill=skill,
+            experience=experience,
+            registration_time=datetime.utcnow(),
+            is_waiting=True
+        )
+        db.add(user)
+        db.flush()
+        return user
+
+def upsert_users(rows):
+    """Register users in bulk, updating the registration of existing users who are still waiting"""
+    if not rows:
+        return []
+    with unit_of_work() as db:
+        invalidate_users(telegram_ids=[row["telegram_id"] for row in rows])
+        upsert = UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+        if upsert is None:
+            users = [
+                create_user(row["telegram_id"], row["username"], row["skill"], row["experience"], row["event_id"])
+                for row in rows
+            ]
+            return [user for user in users if user is not None]
+        
+        # Users already in a team keep their registration, and are not returned
+        statement = upsert(User)
+        statement = statement.on_conflict_do_update(
+            index_elements=[User.telegram_id],
+            set_={
+                "username": statement.excluded.username,
+                "event_id": statement.excluded.event_id,
+                "skill": statement.excluded.skill,
+                "experience": statement.excluded.experience,
+            },
+            where=User.is_waiting == True
+        )
+        # Sent as batched multi-row statements, compiled once
+        return db.scalars(
+            statement.returning(User),
+            [dict(row, is_waiting=True) for row in rows],
+            execution_options={"populate_existing": True}
+        ).all()
+
+def get_waiting_users(event_id=None):
+    """Get all users who are waiting for a team, optionally only those of one event"""
+    with unit_of_work() as db:
+        query = db.query(User).filter(User.is_waiting == True)
+        if event_id is not None:
+            query = query.filter(User.event_id == event_id)
+        return query.order_by(User.registration_time).all()
 
 def get_user_by_telegram_id(telegram_id):
     """Get a user by their Telegram ID"""
-    try:
-        db = get_db()
-        user = db.query(User).filter(User.telegram_id == telegram_id).first()
-        db.close()  # Close the session
+    user = user_cache.get(telegram_id)
+    if user is not MISSING:
         return user
+
+    # Rows read inside a larger transaction may still be rolled back, so only cache committed reads
+    cacheable = not in_unit_of_work()
+    generation = user_cache.generation
+    try:
+        with unit_of_work() as db:
+            user = db.query(User).filter(User.telegram_id == telegram_id).first()
     except Exception as e:
         import logging
-        logging.error(f"Error getting user by Telegram ID: {e}", exc_info=True)
+        logging.error("Error getting user by Telegram ID: %s", e, exc_info=True)
         return None
 
+    if cacheable:
+        user_cache.put(telegram_id, user, generation)
+    return user
+
+def update_users_waiting_status(user_ids, is_waiting):
+    """Update the waiting status of several users at once"""
+    with unit_of_work() as db:
+        invalidate_users(user_ids=user_ids)
+        for start in range(0, len(user_ids), BULK_CHUNK_SIZE):
+            db.execute(
+                update(User)
+                .where(User.id.in_(user_ids[start:start + BULK_CHUNK_SIZE]))
+                .values(is_waiting=is_waiting)
+                .execution_options(synchronize_session=False)
+            )
+        return True
+
+def lock_waiting_users(user_ids):
+    """
+    Lock the given users that are still waiting, skipping rows locked by another transaction.
+    Returns a tuple (locked_ids, unavailable_ids): the users now locked, and those that are
+    no longer waiting or no longer exist. Users skipped only because of a lock are in neither.
+    """
+    with unit_of_work() as db:
+        locked_ids = set()
+        for start in range(0, len(user_ids), BULK_CHUNK_SIZE):
+            locked_ids.update(db.execute(
+                select(User.id)
+                .where(User.id.in_(user_ids[start:start + BULK_CHUNK_SIZE]), User.is_waiting == True)
+                .with_for_update(skip_locked=True)
+            ).scalars())
+        
+        # Tell the skipped users that still wait apart from the ones that are gone, without waiting for their locks
+        skipped_ids = [user_id for user_id in user_ids if user_id not in locked_ids]
+        still_waiting_ids = set()
+        for start in range(0, len(skipped_ids), BULK_CHUNK_SIZE):
+            still_waiting_ids.update(db.execute(
+                select(User.id)
+                .where(User.id.in_(skipped_ids[start:start + BULK_CHUNK_SIZE]), User.is_waiting == True)
+            ).scalars())
+        
+        return locked_ids, set(skipped_ids) - still_waiting_ids
+
 def update_user_waiting_status(user_id, is_waiting):
     """Update a user's waiting status"""
-    db = get_db()
-    user = db.query(User).filter(User.id == user_id).first()
-    if user:
-        user.is_waiting = is_waiting
-        db.commit()
-        return True
-    return False
+    with unit_of_work() as db:
+        invalidate_users(user_ids=[user_id])
+        user = db.query(User).filter(User.id == user_id).first()
+        if user:
+            user.is_waiting = is_waiting
+            db.flush()
+            return True
+        return False
 
 # Team operations
-def create_team():
+def create_team(event_id=config.DEFAULT_EVENT):
     """Create a new team"""
-    db = get_db()
-    team = Team(created_at=datetime.utcnow())
-    db.add(team)
-    db.commit()
-    db.refresh(team)
-    return team
+    with unit_of_work() as db:
+        team = Team(event_id=event_id, created_at=datetime.utcnow())
+        db.add(team)
+        db.flush()
+        return team
+
+def create_teams_bulk(user_id_groups, event_id=config.DEFAULT_EVENT):
+    """Create several teams of one event and their members in a single transaction"""
+    if not user_id_groups:
+        return []
+
+    with unit_of_work() as db:
+        # One multi-row insert for the teams, in the same order as the groups
+        now = datetime.utcnow()
+        team_ids = db.execute(
+            insert(Team).returning(Team.id, sort_by_parameter_order=True),
+            [
+                {"event_id": event_id, "created_at": now, "is_confirmed": False, "member_count": len(user_ids)}
+                for user_ids in user_id_groups
+            ]
+        ).scalars().all()
+
+        # One multi-row insert for the memberships
+        db.execute(
+            insert(TeamMember),
+            [
+                {"team_id": team_id, "user_id": user_id, "has_confirmed": False}
+                for team_id, user_ids in zip(team_ids, user_id_groups)
+                for user_id in user_ids
+            ]
+        )
+
+        # Take the members off the waiting list
+        update_users_waiting_status(
+            [user_id for user_ids in user_id_groups for user_id in user_ids],
+            False
+        )
+
+    return team_ids
 
 def add_user_to_team(user_id, team_id):
     """Add a user to a team"""
-    db = get_db()
-    team_member = TeamMember(user_id=user_id, team_id=team_id)
-    db.add(team_member)
-    db.commit()
-    db.refresh(team_member)
-    return team_member
+    with unit_of_work() as db:
+        team_member = TeamMember(user_id=user_id, team_id=team_id)
+        db.add(team_member)
+        db.flush()
+        db.execute(
+            update(Team)
+            .where(Team.id == team_id)
+            .values(member_count=Team.member_count + 1)
+            .execution_options(synchronize_session=False)
+        )
+        return team_member
 
 def set_team_confirmation(team_id, is_confirmed):
-    """Set a team's confirmation status"""
-    db = get_db()
-    team = db.query(Team).filter(Team.id == team_id).first()
-    if team:
-        team.is_confirmed = is_confirmed
-        db.commit()
-        return True
-    return False
+    """
+    Set a team's confirmation status; a confirmed team leaves the team cache.
+    Returns True if the status changed, so only one caller sees a team become confirmed.
+    """
+    if is_confirmed:
+        team_cache.invalidate(team_id)
+    with unit_of_work() as db:
+        result = db.execute(
+            update(Team)
+            .where(Team.id == team_id, Team.is_confirmed.is_not(is_confirmed))
+            .values(is_confirmed=is_confirmed)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount > 0
 
 def set_team_chat_id(team_id, chat_id):
     """Set a team's chat ID"""
-    db = get_db()
-    team = db.query(Team).filter(Team.id == team_id).first()
-    if team:
-        team.chat_id = chat_id
-        db.commit()
-        return True
-    return False
+    with unit_of_work() as db:
+        team = db.query(Team).filter(Team.id == team_id).first()
+        if team:
+            team.chat_id = chat_id
+            db.flush()
+            return True
+        return False
 
 def set_member_confirmation(user_id, team_id, has_confirmed):
-    """Set a team member's confirmation status"""
-    db = get_db()
-    team_member = db.query(TeamMember).filter(
-        TeamMember.user_id == user_id,
-        TeamMember.team_id == team_id
-    ).first()
-    
-    if team_member:
-        team_member.has_confirmed = has_confirmed
-        db.commit()
-        return True
-    return False
+    """
+    Set a team member's confirmation status, writing it through to the team cache,
+    and count it on the team in the same transaction.
+    Returns a tuple (confirmed_count, member_count) read back from the updated team,
+    or None if the user is not a member of the team.
+    """
+    with unit_of_work() as db:
+        # Only an answer that changes counts, so answering twice is counted once
+        changed = db.execute(
+            update(TeamMember)
+            .where(
+                TeamMember.user_id == user_id,
+                TeamMember.team_id == team_id,
+                func.coalesce(TeamMember.has_confirmed, False) != has_confirmed
+            )
+            .values(has_confirmed=has_confirmed)
+            .execution_options(synchronize_session=False)
+        ).rowcount > 0
+        if not changed and db.execute(
+            select(TeamMember.id).where(TeamMember.user_id == user_id, TeamMember.team_id == team_id)
+        ).first() is None:
+            team_cache.invalidate(team_id)
+            return None
+        
+        # A single atomic statement, so concurrent answers each read back their own count
+        delta = (1 if has_confirmed else -1) if changed else 0
+        counts = db.execute(
+            update(Team)
+            .where(Team.id == team_id)
+            .values(confirmed_count=Team.confirmed_count + delta)
+            .returning(Team.confirmed_count, Team.member_count)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if counts is None:
+            team_cache.invalidate(team_id)
+            return None
+        
+        team_cache.set_member_confirmation(team_id, user_id, has_confirmed)
+        return tuple(counts)
 
 def get_team_members(team_id):
     """Get all members of a team"""
-    db = get_db()
-    return db.query(TeamMember).filter(TeamMember.team_id == team_id).all()
+    with unit_of_work() as db:
+        return db.query(TeamMember).filter(TeamMember.team_id == team_id).all()
 
 def get_team_by_id(team_id):
     """Get a team by its ID"""
-    db = get_db()
-    return db.query(Team).filter(Team.id == team_id).first()
+    with unit_of_work() as db:
+        return db.query(Team).filter(Team.id == team_id).first()
+
+def get_team_with_members(team_id):
+    """Get a team with its members and their users loaded in a single query"""
+    with unit_of_work() as db:
+        return db.query(Team).options(
+            joinedload(Team.members).joinedload(TeamMember.user)
+        ).filter(Team.id == team_id).first()
+
+def dissolve_expired_teams(created_before):
+    """Delete unconfirmed teams created before the cutoff and put their members back on the waiting list"""
+    with unit_of_work() as db:
+        # One indexed query for the expired teams, skipping teams another transaction is working on
+        team_ids = db.execute(
+            select(Team.id)
+            .where(Team.is_confirmed == False, Team.created_at < created_before)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not team_ids:
+            return []
+        team_cache.invalidate_many(team_ids)
+        
+        teams = db.query(Team).options(
+            selectinload(Team.members).joinedload(TeamMember.user)
+        ).filter(Team.id.in_(team_ids)).all()
+        
+        update_users_waiting_status(
+            [member.user_id for team in teams for member in team.members],
+            True
+        )
+        for start in range(0, len(team_ids), BULK_CHUNK_SIZE):
+            chunk = team_ids[start:start + BULK_CHUNK_SIZE]
+            db.execute(
+                delete(TeamMember)
+                .where(TeamMember.team_id.in_(chunk))
+                .execution_options(synchronize_session=False)
+            )
+            db.execute(
+                delete(Team)
+                .where(Team.id.in_(chunk))
+                .execution_options(synchronize_session=False)
+            )
+        
+        return teams
 
 def delete_team(team_id):
     """Delete a team and its members"""
-    db = get_db()
-    # Delete team members first
-    db.query(TeamMember).filter(TeamMember.team_id == team_id).delete()
-    # Then delete the team
-    db.query(Team).filter(Team.id == team_id).delete()
-    db.commit()
-    return True
+    team_cache.invalidate(team_id)
+    with unit_of_work() as db:
+        # Delete team members first
+        db.query(TeamMember).filter(TeamMember.team_id == team_id).delete()
+        # Then delete the team
+        db.query(Team).filter(Team.id == team_id).delete()
+        return True
+
+# Registration state operations
+def get_registration_state(telegram_id, max_age):
+    """Get a user's registration state, ignoring states older than max_age seconds"""
+    with unit_of_work() as db:
+        state = db.get(RegistrationState, telegram_id)
+        if state and state.updated_at >= datetime.utcnow() - timedelta(seconds=max_age):
+            return state.data
+        return None
+
+def save_registration_state(telegram_id, data):
+    """Create or replace a user's registration state"""
+    with unit_of_work() as db:
+        db.merge(RegistrationState(telegram_id=telegram_id, data=data, updated_at=datetime.utcnow()))
+        return True
+
+def delete_registration_state(telegram_id):
+    """Delete a user's registration state"""
+    with unit_of_work() as db:
+        db.execute(delete(RegistrationState).where(RegistrationState.telegram_id == telegram_id))
+        return True
+
+def purge_registration_states(max_age, max_entries):
+    """Delete registration states older than max_age seconds, then the oldest ones beyond max_entries"""
+    with unit_of_work() as db:
+        cutoff = datetime.utcnow() - timedelta(seconds=max_age)
+        db.execute(delete(RegistrationState).where(RegistrationState.updated_at < cutoff))
+        
+        overflow = select(RegistrationState.telegram_id).order_by(
+            RegistrationState.updated_at.desc()
+        ).offset(max_entries).scalar_subquery()
+        db.execute(delete(RegistrationState).where(RegistrationState.telegram_id.in_(overflow)))
+        return True
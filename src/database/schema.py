@@ -0,0 +1,37 @@
+import os
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
+from src.database.models import Base
+from src.database.session import engine
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "alembic.ini")
+
+def upgrade_schema():
+    """
+    Bring the database schema up to date by running the Alembic migrations.
+    Databases created by the old create_all() startup are stamped with the
+    revision matching their schema first, so their data is kept.
+    """
+    alembic_config = Config(ALEMBIC_INI)
+    alembic_config.attributes["configure_logger"] = False
+    
+    with engine.begin() as connection:
+        alembic_config.attributes["connection"] = connection
+        
+        inspector = inspect(connection)
+        tables = inspector.get_table_names()
+        if "users" in tables and "alembic_version" not in tables:
+            index_names = {index["name"] for index in inspector.get_indexes("team_members")}
+            command.stamp(alembic_config, "0002" if "ix_team_members_team_id" in index_names else "0001")
+        
+        command.upgrade(alembic_config, "head")
+
+def create_schema():
+    """Create any missing tables straight from the models, for tests and scratch databases"""
+    Base.metadata.create_all(bind=engine)
+
+if __name__ == "__main__":
+    upgrade_schema()
@@ -0,0 +1,78 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import config
+from src.metrics import instrument_engine
+
+def create_db_engine(database_url):
+    """Create a database engine with the configured connection pool settings"""
+    if database_url.startswith("sqlite"):
+        # SQLite connections are shared with the database worker threads
+        connect_args = {"check_same_thread": False}
+        if database_url in ("sqlite://", "sqlite:///:memory:"):
+            # Every connection to an in-memory database would get its own empty database
+            return create_engine(database_url, connect_args=connect_args, poolclass=StaticPool)
+        return create_engine(database_url, connect_args=connect_args)
+    
+    return create_engine(
+        database_url,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        pool_pre_ping=config.DB_POOL_PRE_PING
+    )
+
+# Shared engine for the whole process
+engine = create_db_engine(config.DATABASE_URL)
+instrument_engine(engine)
+
+# Objects stay usable after commit instead of being reloaded on the next attribute access
+SessionLocal = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+# Session of the unit of work running in the current context
+_current_session = ContextVar("current_session", default=None)
+
+def in_unit_of_work():
+    """Tell whether the current context is inside a unit of work"""
+    return _current_session.get() is not None
+
+def after_commit(callback):
+    """
+    Call callback once the current unit of work has committed, or right away outside of one.
+    Callbacks of a unit of work that rolls back are dropped.
+    """
+    session = _current_session.get()
+    if session is None:
+        callback()
+        return
+    session.info.setdefault("after_commit", []).append(callback)
+
+@contextmanager
+def unit_of_work():
+    """
+    Run a block of database work in a single session and transaction.
+    Nested calls join the outer unit of work; the outermost one commits on
+    success, rolls back on error and always closes the session.
+    """
+    session = _current_session.get()
+    if session is not None:
+        yield session
+        return
+    
+    session = SessionLocal()
+    token = _current_session.set(session)
+    try:
+        yield session
+        session.commit()
+        for callback in session.info.pop("after_commit", []):
+            callback()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        _current_session.reset(token)
+        session.close()
@@ -0,0 +1,94 @@
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import os
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import config
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has; anything else on a record was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "sample"}
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, with the `extra` fields as keys"""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(
+            (key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES
+        )
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep one in `every` records logged with extra={"sample": True}, and every other record.
+    Used for per-update events that would flood the logs under load.
+    """
+
+    def __init__(self, every):
+        super().__init__()
+        self.every = max(every, 1)
+        self._counter = itertools.count()
+
+    def filter(self, record):
+        if self.every == 1 or not getattr(record, "sample", False):
+            return True
+        return next(self._counter) % self.every == 0
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue records for the listener thread without formatting them first.
+    The queue never leaves the process, so records need not be made picklable,
+    and message formatting moves off the event loop with the I/O.
+    """
+
+    def prepare(self, record):
+        return record
+
+class BackgroundListener(logging.handlers.QueueListener):
+    """A queue listener that can be stopped more than once, by the caller and at exit"""
+
+    def stop(self):
+        if self._thread is not None:
+            super().stop()
+
+def configure_logging(level=None, log_format=None, sample_every=None):
+    """
+    Send the log records through a queue to a background thread that formats and writes them.
+    Returns the queue listener, which is stopped when the process exits.
+    """
+    level = level or config.LOG_LEVEL
+    log_format = log_format or config.LOG_FORMAT
+    sample_every = sample_every or config.LOG_SAMPLE_EVERY
+
+    output = logging.StreamHandler()
+    output.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT))
+
+    records = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(records)
+    queue_handler.addFilter(SamplingFilter(sample_every))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = BackgroundListener(records, output, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,247 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds of the buckets counting database queries per update
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+class Counter:
+    """A monotonically increasing count, per set of labels"""
+
+    kind = "counter"
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def render(self):
+        with self._lock:
+            return [f"{self.name}{_format_labels(key)} {value}" for key, value in self._values.items()]
+
+    def summary(self):
+        with self._lock:
+            return [f"{self.name}{_format_labels(key)}={value}" for key, value in self._values.items()]
+
+class Histogram:
+    """Observations counted in cumulative buckets, per set of labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name, description, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # One count per bucket plus the +Inf bucket, then the sum and the total count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels):
+        series = self._series.get(_label_key(labels))
+        return series[2] if series else 0
+
+    def quantile(self, fraction, **labels):
+        """
+        Estimate a quantile as the upper bound of the bucket it falls in.
+        Returns None without observations, and infinity past the last bucket.
+        """
+        with self._lock:
+            series = self._series.get(_label_key(labels))
+            if not series:
+                return None
+            return self._quantile(series, fraction)
+
+    def _quantile(self, series, fraction):
+        rank = fraction * series[2]
+        seen = 0
+        for bound, count in zip(self.buckets, series[0]):
+            seen += count
+            if seen >= rank and seen > 0:
+                return bound
+        return float("inf")
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for key, (counts, total, count) in self._series.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+    def summary(self):
+        with self._lock:
+            return [
+                f"{self.name}{_format_labels(key)} n={series[2]} avg={series[1] / series[2]:.4g}"
+                f" p50<={self._quantile(series, 0.5)} p99<={self._quantile(series, 0.99)}"
+                for key, series in self._series.items()
+            ]
+
+class Gauge:
+    """A value read from a callback whenever the metrics are collected"""
+
+    kind = "gauge"
+
+    def __init__(self, name, description, read):
+        self.name = name
+        self.description = description
+        self.read = read
+
+    def render(self):
+        return [f"{self.name} {self.read()}"]
+
+    def summary(self):
+        return [f"{self.name}={self.read()}"]
+
+class MetricsRegistry:
+    """
+    The process's metrics, rendered in the Prometheus text format for /metrics
+    or as a one-line summary for the logs.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, description):
+        return self._register(Counter(name, description))
+
+    def histogram(self, name, description, buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, description, buckets))
+
+    def gauge(self, name, description, read):
+        return self._register(Gauge(name, description, read))
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Summarize every metric with observations on a single line"""
+        return "; ".join(line for metric in self._metrics.values() for line in metric.summary())
+
+
+# Process-wide registry and the hot path metrics
+registry = MetricsRegistry()
+
+update_latency = registry.histogram(
+    "bot_update_seconds", "Time spent handling a Telegram update, per handler"
+)
+update_queries = registry.histogram(
+    "bot_update_db_queries", "Database queries run while handling an update, per handler", QUERY_COUNT_BUCKETS
+)
+db_query_latency = registry.histogram(
+    "db_query_seconds", "Time spent executing a database statement, per statement type"
+)
+db_operation_latency = registry.histogram(
+    "db_operation_seconds", "Time spent in a database operation run off the event loop, per operation"
+)
+job_latency = registry.histogram(
+    "bot_job_seconds", "Time spent in a background job, per job"
+)
+telegram_send_latency = registry.histogram(
+    "telegram_send_seconds", "Time spent sending a message to Telegram"
+)
+notifications = registry.counter(
+    "notifications_total", "Notifications handled by the dispatcher, per result"
+)
+
+# Queries counted for the update being handled in the current context
+_update_query_count = ContextVar("update_query_count", default=None)
+
+@contextmanager
+def timed(histogram, **labels):
+    """Observe the time spent in the block"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started, **labels)
+
+def track_update(handler):
+    """
+    Decorate an update handler to record its latency and its database query count.
+    Queries run in the database executor are counted too, as it copies the context.
+    """
+    @functools.wraps(handler)
+    async def wrapper(update, context):
+        queries = [0]
+        token = _update_query_count.set(queries)
+        started = time.perf_counter()
+        try:
+            return await handler(update, context)
+        finally:
+            update_latency.observe(time.perf_counter() - started, handler=handler.__name__)
+            update_queries.observe(queries[0], handler=handler.__name__)
+            _update_query_count.reset(token)
+    return wrapper
+
+def instrument_engine(engine):
+    """Time every statement the engine executes and count it against the current update"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+        queries = _update_query_count.get()
+        if queries is not None:
+            queries[0] += 1
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        statement_type = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        db_query_latency.observe(time.perf_counter() - started, statement=statement_type)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        # Failed statements never reach after_cursor_execute
+        if context.connection is not None and context.connection.info.get("query_started"):
+            context.connection.info["query_started"].pop()
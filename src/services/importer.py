@@ -0,0 +1,156 @@
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import sys
+import os
+from datetime import datetime
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+import config
+from src.database import operations
+from src.logging_setup import configure_logging
+from src.services.pool import waiting_pool
+
+logger = logging.getLogger(__name__)
+
+# Rows validated and written per transaction
+IMPORT_CHUNK_SIZE = 5000
+
+def read_rows(path, file_format=None):
+    """
+    Stream the rows of a CSV (with a header line) or JSON Lines export.
+    Yields (line_number, row) tuples, row being a dictionary.
+    """
+    file_format = file_format or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+    with open(path, newline="", encoding="utf-8") as export:
+        if file_format == "csv":
+            # Line 1 is the header
+            for line_number, row in enumerate(csv.DictReader(export), start=2):
+                yield line_number, row
+            return
+
+        for line_number, line in enumerate(export, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError as e:
+                yield line_number, {"_error": f"invalid JSON: {e}"}
+
+def validate_row(row, default_event=config.DEFAULT_EVENT):
+    """
+    Check a row against the skills and experience levels of its event.
+    Returns a tuple (user, error): the values to register, or the reason the row is rejected.
+    """
+    if "_error" in row:
+        return None, row["_error"]
+
+    try:
+        telegram_id = int(row.get("telegram_id"))
+    except (TypeError, ValueError):
+        return None, f"invalid telegram_id {row.get('telegram_id')!r}"
+
+    event_id = row.get("event") or default_event
+    if event_id not in config.EVENTS:
+        return None, f"unknown event {event_id!r}"
+
+    settings = config.get_event_settings(event_id)
+    skill = (row.get("skill") or "").strip()
+    if skill not in settings["required_skills"]:
+        return None, f"unknown skill {skill!r}"
+    experience = (row.get("experience") or "").strip()
+    if experience not in settings["experience_levels"]:
+        return None, f"unknown experience level {experience!r}"
+
+    registration_time = datetime.utcnow()
+    if row.get("registration_time"):
+        try:
+            registration_time = datetime.fromisoformat(str(row["registration_time"]))
+        except ValueError:
+            return None, f"invalid registration_time {row['registration_time']!r}"
+
+    return {
+        "telegram_id": telegram_id,
+        "username": (row.get("username") or "").lstrip("@") or None,
+        "event_id": event_id,
+        "skill": skill,
+        "experience": experience,
+        "registration_time": registration_time,
+    }, None
+
+def import_users(rows, default_event=config.DEFAULT_EVENT, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Register users from (line_number, row) tuples, one transaction per chunk.
+    Invalid rows are skipped; users already in a team keep their registration.
+    Returns a dictionary with the number of imported users, the events they
+    joined and the skipped rows as (line_number, reason) tuples.
+    """
+    result = {"imported": 0, "events": set(), "skipped": []}
+    chunk = {}
+
+    def flush():
+        users = operations.upsert_users(list(chunk.values()))
+        for user in users:
+            waiting_pool.add(user)
+        result["imported"] += len(users)
+        result["events"].update(user.event_id for user in users)
+        chunk.clear()
+
+    for line_number, row in rows:
+        user, error = validate_row(row, default_event)
+        if error:
+            result["skipped"].append((line_number, error))
+            continue
+
+        # A user listed twice keeps their last row
+        chunk[user["telegram_id"]] = user
+        if len(chunk) >= chunk_size:
+            flush()
+
+    if chunk:
+        flush()
+    return result
+
+async def notify_imported_teams(matched_teams):
+    """Ask the members of teams matched during an import to confirm them"""
+    from telegram import Bot
+    from types import SimpleNamespace
+    from src.bot.handlers import notify_matched_teams
+
+    async with Bot(config.TELEGRAM_BOT_TOKEN) as bot:
+        await notify_matched_teams(SimpleNamespace(bot=bot), matched_teams)
+
+def main():
+    parser = argparse.ArgumentParser(description="Import registrations from a sign-up form export")
+    parser.add_argument("path", help="CSV or JSON Lines file with telegram_id, username, skill, experience and optionally event and registration_time")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="file format, guessed from the extension by default")
+    parser.add_argument("--event", default=config.DEFAULT_EVENT, help="event of the rows without one")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    parser.add_argument("--match", action="store_true", help="match the imported events and notify the teams")
+    args = parser.parse_args()
+
+    configure_logging()
+    if args.match:
+        from src.services.sharding import check_match_mode
+        check_match_mode()
+    result = import_users(read_rows(args.path, args.format), args.event, args.chunk_size)
+    for line_number, reason in result["skipped"]:
+        logger.warning("Skipped line %d: %s", line_number, reason)
+    logger.info("Imported %d users, skipped %d rows", result["imported"], len(result["skipped"]))
+
+    if args.match and result["events"]:
+        from src.services.matcher import batch_match_teams
+        from src.services.pool import load_waiting_pool
+
+        # Match the users who were already waiting too
+        load_waiting_pool()
+        matched_teams = batch_match_teams(sorted(result["events"]))
+        logger.info("Matched %d teams", len(matched_teams))
+        if matched_teams:
+            asyncio.run(notify_imported_teams(matched_teams))
+
+if __name__ == "__main__":
+    main()
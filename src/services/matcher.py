@@ -1,50 +1,21 @@
 import sys
 import os
+import threading
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 import config
 from src.database import operations
+from src.services.pool import waiting_pool
 
-def find_potential_team():
+def find_potential_team(event_id=config.DEFAULT_EVENT):
     """
     Find potential team members based on skill requirements.
+    Users are picked from the event's in-memory waiting pool, longest-waiting first.
     Returns a list of users that can form a team, or None if not possible.
     """
-    waiting_users = operations.get_waiting_users()
-    
-    if len(waiting_users) < config.TEAM_SIZE:
-        return None
-    
-    # Group users by skill
-    users_by_skill = {}
-    for skill in config.REQUIRED_SKILLS:
-        users_by_skill[skill] = [user for user in waiting_users if user.skill == skill]
-    
-    # Try to form a team with one user from each required skill
-    team_members = []
-    
-    for skill in config.REQUIRED_SKILLS:
-        if users_by_skill[skill]:
-            # Take the user who has been waiting the longest
-            team_members.append(users_by_skill[skill][0])
-        else:
-            # If no user with this skill, check if we can duplicate from other skills
-            remaining_skills = [s for s in config.REQUIRED_SKILLS if s != skill]
-            for remaining_skill in remaining_skills:
-                if len(users_by_skill[remaining_skill]) > 1:
-                    # Take the second user who has been waiting the longest
-                    team_members.append(users_by_skill[remaining_skill][1])
-                    break
-            else:
-                # If we can't find a replacement, we can't form a team
-                return None
-    
-    # If we don't have enough members, we can't form a team
-    if len(team_members) < config.TEAM_SIZE:
-        return None
-    
-    return team_members[:config.TEAM_SIZE]
+    team_size = config.get_event_settings(event_id)["team_size"]
+    return waiting_pool.pool(event_id).find_team(team_size)
 
 def create_team_from_users(users):
     """
@@ -60,93 +31,141 @@ def create_team_from_users(users):
 
 def check_team_confirmation(team_id):
     """
-    Check if all members of a team have confirmed.
+    Check if all members of a team have confirmed, from the team's counters.
     Returns True if all members have confirmed, False otherwise.
     """
-    team_members = operations.get_team_members(team_id)
+    team = operations.get_team_by_id(team_id)
     
-    if not team_members:
+    if not team or not team.member_count:
         return False
     
-    return all(member.has_confirmed for member in team_members)
+    return team.confirmed_count >= team.member_count
 
-def batch_match_teams():
+def plan_batch_teams(users_by_skill, team_size=None, skills=None):
     """
-    Match multiple teams at once from the waiting users pool.
-    Returns a list of created teams.
+    Split a snapshot of the waiting pool into teams in a single pass.
+    Each team takes the longest-waiting user of every skill that still has users,
+    so balanced teams are formed first; once a skill runs out its slot is filled
+    from the other skills in order, and the leftovers are grouped the same way.
+    Returns a list of teams, each a list of users.
     """
-    waiting_users = operations.get_waiting_users()
-    created_teams = []
+    team_size = team_size or config.TEAM_SIZE
+    skills = skills or config.REQUIRED_SKILLS
     
-    # Group users by skill
-    users_by_skill = {}
-    for skill in config.REQUIRED_SKILLS:
-        users_by_skill[skill] = [user for user in waiting_users if user.skill == skill]
+    buckets = [users_by_skill.get(skill, []) for skill in skills]
+    cursors = [0] * len(buckets)
+    remaining = sum(len(bucket) for bucket in buckets)
+    teams = []
     
-    # Keep matching teams until we can't form any more
-    while True:
-        # Try to form a balanced team first (one from each skill)
+    while remaining >= team_size:
         team_members = []
-        for skill in config.REQUIRED_SKILLS:
-            if users_by_skill[skill]:
-                team_members.append(users_by_skill[skill][0])
-                users_by_skill[skill].pop(0)
-            else:
-                # If we can't find a user with this skill, try to find a replacement
-                found_replacement = False
-                for other_skill in config.REQUIRED_SKILLS:
-                    if len(users_by_skill[other_skill]) > (1 if other_skill in [m.skill for m in team_members] else 0):
-                        # Use a user from another skill as replacement
-                        replacement_index = 0
-                        while replacement_index < len(users_by_skill[other_skill]):
-                            if users_by_skill[other_skill][replacement_index].skill not in [m.skill for m in team_members]:
-                                team_members.append(users_by_skill[other_skill][replacement_index])
-                                users_by_skill[other_skill].pop(replacement_index)
-                                found_replacement = True
-                                break
-                            replacement_index += 1
-                        if found_replacement:
-                            break
-                
-                if not found_replacement:
-                    # If we can't find a replacement, we'll have to use a duplicate skill
-                    for other_skill in config.REQUIRED_SKILLS:
-                        if users_by_skill[other_skill]:
-                            team_members.append(users_by_skill[other_skill][0])
-                            users_by_skill[other_skill].pop(0)
-                            found_replacement = True
-                            break
-                    
-                    if not found_replacement:
-                        # If we still can't find a replacement, we can't form a team
-                        break
         
-        # If we don't have enough members, we can't form a team
-        if len(team_members) < config.TEAM_SIZE:
-            # Try to form a team with whatever users we have left
-            all_remaining_users = []
-            for skill in config.REQUIRED_SKILLS:
-                all_remaining_users.extend(users_by_skill[skill])
-            
-            if len(all_remaining_users) >= config.TEAM_SIZE:
-                # Form a team with the first TEAM_SIZE users
-                team_members = all_remaining_users[:config.TEAM_SIZE]
-                
-                # Remove these users from the skill groups
-                for user in team_members:
-                    if user in users_by_skill[user.skill]:
-                        users_by_skill[user.skill].remove(user)
-            else:
-                # Not enough users left to form a team
+        # One user from each skill that still has someone waiting
+        for index, bucket in enumerate(buckets):
+            if len(team_members) == team_size:
                 break
+            if cursors[index] < len(bucket):
+                team_members.append(bucket[cursors[index]])
+                cursors[index] += 1
+        
+        # Fill the missing skills with the next users of the other skills
+        for index, bucket in enumerate(buckets):
+            while len(team_members) < team_size and cursors[index] < len(bucket):
+                team_members.append(bucket[cursors[index]])
+                cursors[index] += 1
         
-        # Create a team with these members
-        if len(team_members) == config.TEAM_SIZE:
-            from src.services import team_manager
-            team = team_manager.create_team_from_users(team_members)
-            created_teams.append((team, team_members))
-        else:
-            # Not enough members to form a team
-            break
+        remaining -= team_size
+        teams.append(team_members)
+    
+    return teams
+
+def batch_match_teams(event_ids=None):
+    """
+    Match multiple teams at once from the waiting users pools, by default for every event.
+    Events are planned in parallel worker processes, then each event's teams are
+    created in a single database transaction, holding row locks on their members.
+    Returns a list of (team_id, team_members) tuples.
+    """
+    from src.services import sharding, team_manager
+    
+    if event_ids is None:
+        event_ids = waiting_pool.events()
+    
+    created_teams = []
+    for event_id, planned_teams in sharding.plan_event_teams(event_ids).items():
+        if planned_teams:
+            created_teams.extend(team_manager.create_teams_from_users(planned_teams, event_id))
     
-    return created_teams
\ No newline at end of file
+    return created_teams
+
+class IncrementalMatcher:
+    """
+    Matches teams from the changes to the waiting pools instead of re-planning every pool.
+    Every matching run leaves each pool without a full team, so a new team can only form
+    around users who arrived since: new registrations, edits, and users returning from a
+    declined or expired team. Only the events that gained users are looked at, and they
+    are only planned once they hold enough users for a team.
+    """
+
+    def __init__(self, pools):
+        # Never call into the pools while holding self._lock; see match()
+        self.pools = pools
+        self._pending = set()
+        self._lock = threading.Lock()
+        pools.subscribe(self._on_pool_change)
+
+    def _on_pool_change(self, change, event_id, user_id):
+        # Users leaving a pool never complete a team
+        if change == "add":
+            with self._lock:
+                self._pending.add(event_id)
+
+    def has_pending(self):
+        """Check whether some events gained users since the last run"""
+        with self._lock:
+            return bool(self._pending)
+
+    def match(self):
+        """
+        Match the teams that the users added since the last run can complete.
+        Returns a list of (team_id, team_members) tuples.
+        """
+        with self._lock:
+            event_ids, self._pending = self._pending, set()
+        
+        ready_events = [
+            event_id for event_id in event_ids
+            if len(self.pools.pool(event_id)) >= config.get_event_settings(event_id)["team_size"]
+        ]
+        if not ready_events:
+            return []
+        
+        try:
+            created_teams = batch_match_teams(ready_events)
+        except Exception:
+            # The users are still waiting; leave the events for the next run
+            with self._lock:
+                self._pending.update(ready_events)
+            raise
+        
+        # Teams skipped because a member was taken elsewhere leave the rest for another run.
+        # The pools are read before taking the matcher lock: they notify this matcher while
+        # holding their own lock, so holding both here in the other order could deadlock
+        still_ready = [
+            event_id for event_id in ready_events
+            if len(self.pools.pool(event_id)) >= config.get_event_settings(event_id)["team_size"]
+        ]
+        with self._lock:
+            self._pending.update(still_ready)
+        
+        return created_teams
+
+# Process-wide matcher fed by the waiting pools
+incremental_matcher = IncrementalMatcher(waiting_pool)
+
+def match_pending_teams():
+    """
+    Match the teams completed by the users who joined the waiting pools since the last run.
+    Returns a list of (team_id, team_members) tuples.
+    """
+    return incremental_matcher.match()
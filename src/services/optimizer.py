@@ -0,0 +1,160 @@
+import sys
+import os
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+import config
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Score weights: every required skill a team covers is worth 1, and the squared gap between
+# a team's mean experience and the pool's mean (both scaled to 0-1) costs EXPERIENCE_WEIGHT.
+# Who is left unmatched is not scored: it is always the most recent users
+COVERAGE_WEIGHT = 1.0
+EXPERIENCE_WEIGHT = 0.5
+
+# Local search budget: random swaps scored per round, rounds, and rounds without improvement before stopping
+SWAP_SAMPLES = 4096
+SWAP_ROUNDS = 64
+SWAP_PATIENCE = 4
+
+def is_available():
+    """Check whether NumPy, needed by the optimized matcher, is installed"""
+    return np is not None
+
+def plan_optimized_teams(users_by_skill, team_size=None, skills=None, experience_levels=None, seed=0):
+    """
+    Split a snapshot of the waiting pool into teams that cover the skills and balance
+    experience. Like the greedy matcher, only the most recent users are left out:
+    the longest-waiting users are dealt to teams in a snake order by skill and experience,
+    then the assignment is improved with batches of random swaps between teams scored
+    with NumPy.
+    Returns a list of teams, each a list of users, like plan_batch_teams().
+    """
+    team_size = team_size or config.TEAM_SIZE
+    skills = skills or config.REQUIRED_SKILLS
+    experience_levels = experience_levels or config.EXPERIENCE_LEVELS
+
+    users = [user for skill in skills for user in users_by_skill.get(skill, [])]
+    team_count = len(users) // team_size
+    if team_count == 0:
+        return []
+
+    skill, experience, wait, order = _encode(users, skills, experience_levels)
+    team_of = _deal(skill, experience, order, team_count, team_size)
+    _improve(team_of, skill, experience, team_count, team_size, len(skills), seed)
+
+    # Members grouped by team, in skill order then registration order, like the greedy matcher
+    members = np.lexsort((np.argsort(order), skill, team_of))[:team_count * team_size]
+    members = members.reshape(team_count, team_size)
+    team_order = np.argsort(-wait[members].max(axis=1), kind="stable")
+    return [[users[index] for index in members[team]] for team in team_order]
+
+def _encode(users, skills, experience_levels):
+    """
+    Encode the users as arrays: skill index, experience scaled to 0-1, wait scaled to 0-1
+    (1 for the longest-waiting user), and the users' indices in registration order.
+    """
+    skill_index = {name: index for index, name in enumerate(skills)}
+    level_index = {name: index for index, name in enumerate(experience_levels)}
+    top_level = max(len(experience_levels) - 1, 1)
+
+    skill = np.array([skill_index[user.skill] for user in users], dtype=np.int64)
+    experience = np.array(
+        [level_index.get(user.experience, top_level / 2) for user in users], dtype=np.float64
+    ) / top_level
+    registered = np.array([user.registration_time.timestamp() for user in users], dtype=np.float64)
+    ids = np.array([user.id for user in users], dtype=np.int64)
+
+    order = np.lexsort((ids, registered))
+    wait = registered.max() - registered
+    wait /= max(wait.max(), 1.0)
+    return skill, experience, wait, order
+
+def _deal(skill, experience, order, team_count, team_size):
+    """
+    Give the longest-waiting users a team, sorted by skill and experience and dealt in
+    snake order, so every team gets a share of each skill and of each experience level.
+    Returns each user's team index; the unmatched users get team_count.
+    """
+    team_of = np.full(len(skill), team_count, dtype=np.int64)
+    matched = order[:team_count * team_size]
+    dealt = matched[np.lexsort((experience[matched], skill[matched]))]
+
+    position = np.arange(len(dealt))
+    column = position % team_count
+    team_of[dealt] = np.where((position // team_count) % 2 == 0, column, team_count - 1 - column)
+    return team_of
+
+def _improve(team_of, skill, experience, team_count, team_size, skill_count, seed):
+    """
+    Improve the assignment in place with swaps between two teams. The unmatched users are
+    never swapped in, so they stay the most recent ones. Each round scores a batch of random
+    swaps at once and applies the best ones that do not touch the same team or user twice.
+    """
+    rng = np.random.default_rng(seed)
+    target = experience.mean()
+    matched = np.flatnonzero(team_of < team_count)
+
+    counts = np.zeros((team_count + 1, skill_count), dtype=np.int64)
+    np.add.at(counts, (team_of, skill), 1)
+    experience_sum = np.bincount(team_of, weights=experience, minlength=team_count + 1)
+
+    idle_rounds = 0
+    for _ in range(SWAP_ROUNDS):
+        first = matched[rng.integers(0, len(matched), SWAP_SAMPLES)]
+        second = matched[rng.integers(0, len(matched), SWAP_SAMPLES)]
+        gain = _swap_gain(first, second, team_of, skill, experience, counts, experience_sum, target, team_size)
+
+        applied = 0
+        touched = np.zeros(team_count, dtype=bool)
+        swapped = np.zeros(len(team_of), dtype=bool)
+        for candidate in np.argsort(-gain, kind="stable"):
+            if gain[candidate] <= 1e-9:
+                break
+            a, b = first[candidate], second[candidate]
+            team_a, team_b = team_of[a], team_of[b]
+            if team_a == team_b or touched[team_a] or touched[team_b] or swapped[a] or swapped[b]:
+                continue
+
+            counts[team_a, skill[a]] -= 1
+            counts[team_a, skill[b]] += 1
+            counts[team_b, skill[b]] -= 1
+            counts[team_b, skill[a]] += 1
+            experience_sum[team_a] += experience[b] - experience[a]
+            experience_sum[team_b] += experience[a] - experience[b]
+            team_of[a], team_of[b] = team_b, team_a
+
+            touched[[team_a, team_b]] = True
+            swapped[[a, b]] = True
+            applied += 1
+
+        idle_rounds = 0 if applied else idle_rounds + 1
+        if idle_rounds >= SWAP_PATIENCE:
+            break
+
+def _swap_gain(first, second, team_of, skill, experience, counts, experience_sum, target, team_size):
+    """Score the gain of swapping each pair of users between their teams"""
+    team_a, team_b = team_of[first], team_of[second]
+    skill_a, skill_b = skill[first], skill[second]
+    experience_a, experience_b = experience[first], experience[second]
+
+    # Skill coverage: a team gains a skill it lacked and may lose its only member of another
+    moved = skill_a != skill_b
+    coverage_a = (counts[team_a, skill_b] == 0).astype(np.float64) - (counts[team_a, skill_a] == 1)
+    coverage_b = (counts[team_b, skill_a] == 0).astype(np.float64) - (counts[team_b, skill_b] == 1)
+    coverage = np.where(moved, coverage_a + coverage_b, 0.0)
+
+    # Experience balance: how much closer each team's mean gets to the pool's mean
+    def gap(total):
+        return (total / team_size - target) ** 2
+
+    old_a, old_b = experience_sum[team_a], experience_sum[team_b]
+    shift = experience_b - experience_a
+    balance = gap(old_a) - gap(old_a + shift) + gap(old_b) - gap(old_b - shift)
+
+    gain = COVERAGE_WEIGHT * coverage + EXPERIENCE_WEIGHT * balance
+    return np.where(team_a != team_b, gain, -np.inf)
@@ -0,0 +1,305 @@
+import sys
+import os
+import threading
+from collections import deque, namedtuple
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+import config
+from src import metrics
+from src.database import operations
+
+# Lightweight copy of the user columns the matcher needs
+PoolEntry = namedtuple(
+    "PoolEntry",
+    ["id", "telegram_id", "username", "event_id", "skill", "experience", "registration_time"]
+)
+
+class WaitingPool:
+    """
+    In-memory index of the users waiting for a team.
+    Users are kept in one FIFO deque per skill, ordered by registration time,
+    so a team can be picked from the bucket heads without scanning the pool.
+    The pool is shared between the event loop and the database worker threads,
+    so every method holds the pool lock.
+    """
+
+    def __init__(self, skills):
+        self.skills = list(skills)
+        self._buckets = {skill: deque() for skill in self.skills}
+        self._entries = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, user_id):
+        return user_id in self._entries
+
+    def clear(self):
+        """Remove every user from the pool"""
+        with self._lock:
+            for bucket in self._buckets.values():
+                bucket.clear()
+            self._entries.clear()
+
+    def rebuild(self, users):
+        """
+        Replace the pool contents with the given users.
+        The users are expected in registration order, as returned by get_waiting_users().
+        """
+        with self._lock:
+            self.clear()
+            for user in users:
+                self.add(user)
+
+    def add(self, user):
+        """
+        Add a user to the pool, or move them if their registration changed.
+        Returns False if the user's skill is not one of the pool's skills.
+        """
+        entry = PoolEntry(
+            id=user.id,
+            telegram_id=user.telegram_id,
+            username=user.username,
+            event_id=user.event_id,
+            skill=user.skill,
+            experience=user.experience,
+            registration_time=user.registration_time
+        )
+
+        with self._lock:
+            if entry.id in self._entries:
+                self._remove(entry.id)
+
+            bucket = self._buckets.get(entry.skill)
+            if bucket is None:
+                return False
+
+            if not bucket or _sort_key(bucket[-1]) <= _sort_key(entry):
+                bucket.append(entry)
+            else:
+                # Users returning from a declined team keep their original place in the queue
+                index = len(bucket)
+                while index > 0 and _sort_key(bucket[index - 1]) > _sort_key(entry):
+                    index -= 1
+                bucket.insert(index, entry)
+
+            self._entries[entry.id] = entry
+            return True
+
+    def remove(self, user_id):
+        """
+        Remove a user from the pool.
+        Returns True if the user was in the pool, False otherwise.
+        """
+        with self._lock:
+            return self._remove(user_id)
+
+    def remove_many(self, user_ids):
+        """Remove several users from the pool"""
+        with self._lock:
+            for user_id in user_ids:
+                self._remove(user_id)
+
+    def find_team(self, team_size):
+        """
+        Pick the longest-waiting users that can form a team, without removing them.
+        One user is taken from each skill first; missing skills are filled with the
+        next users of the other skills. Returns a list of entries or None.
+        """
+        with self._lock:
+            if len(self._entries) < team_size:
+                return None
+
+            team_members = []
+            taken = {}
+            for skill in self.skills:
+                if len(team_members) == team_size:
+                    break
+                if self._buckets[skill]:
+                    team_members.append(self._buckets[skill][0])
+                    taken[skill] = 1
+
+            for skill in self.skills:
+                bucket = self._buckets[skill]
+                index = taken.get(skill, 0)
+                while len(team_members) < team_size and index < len(bucket):
+                    team_members.append(bucket[index])
+                    index += 1
+
+            if len(team_members) < team_size:
+                return None
+
+            return team_members
+
+    def get(self, user_id):
+        """Get a user's pool entry, or None if the user is not in the pool"""
+        return self._entries.get(user_id)
+
+    def snapshot(self):
+        """
+        Get a copy of the pool grouped by skill.
+        Returns a dictionary mapping each skill to its waiting users in FIFO order.
+        """
+        with self._lock:
+            return {skill: list(bucket) for skill, bucket in self._buckets.items()}
+
+    def _remove(self, user_id):
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return False
+
+        bucket = self._buckets[entry.skill]
+        if bucket[0] is entry:
+            bucket.popleft()
+        else:
+            bucket.remove(entry)
+        return True
+
+
+def _sort_key(entry):
+    return (entry.registration_time, entry.id)
+
+
+class EventPools:
+    """
+    The waiting pools of every hackathon event, each with the event's skills.
+    Users are routed to the pool of their event, and moved if they switch events.
+    Subscribers are told about every change as ("add" | "remove", event_id, user_id).
+    """
+
+    def __init__(self):
+        self._pools = {}
+        self._events = {}
+        self._listeners = []
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._events)
+
+    def __contains__(self, user_id):
+        return user_id in self._events
+
+    def pool(self, event_id=config.DEFAULT_EVENT):
+        """Get the waiting pool of an event, creating it if needed"""
+        with self._lock:
+            pool = self._pools.get(event_id)
+            if pool is None:
+                pool = WaitingPool(config.get_event_settings(event_id)["required_skills"])
+                self._pools[event_id] = pool
+            return pool
+
+    def subscribe(self, listener):
+        """Call listener(change, event_id, user_id) whenever a user is added to or removed from a pool"""
+        self._listeners.append(listener)
+
+    def _notify(self, change, event_id, user_id):
+        for listener in self._listeners:
+            listener(change, event_id, user_id)
+
+    def get(self, user_id):
+        """Get a user's pool entry, or None if the user is not in a pool"""
+        with self._lock:
+            event_id = self._events.get(user_id)
+            return self._pools[event_id].get(user_id) if event_id is not None else None
+
+    def user_ids(self):
+        """Get the IDs of the users in every pool"""
+        with self._lock:
+            return set(self._events)
+
+    def events(self):
+        """Get the events that have a waiting pool"""
+        with self._lock:
+            return list(self._pools)
+
+    def clear(self):
+        """Remove every user from every pool"""
+        with self._lock:
+            for pool in self._pools.values():
+                pool.clear()
+            self._events.clear()
+
+    def rebuild(self, users):
+        """
+        Replace the pools' contents with the given users.
+        The users are expected in registration order, as returned by get_waiting_users().
+        """
+        with self._lock:
+            self.clear()
+            for user in users:
+                self.add(user)
+
+    def add(self, user):
+        """
+        Add a user to the pool of their event, or move them if their registration changed.
+        Returns False if the user's skill is not one of the event's skills.
+        """
+        with self._lock:
+            previous_event = self._events.pop(user.id, None)
+            if previous_event is not None and previous_event != user.event_id:
+                self._pools[previous_event].remove(user.id)
+                self._notify("remove", previous_event, user.id)
+
+            added = self.pool(user.event_id).add(user)
+            if added:
+                self._events[user.id] = user.event_id
+                self._notify("add", user.event_id, user.id)
+            elif previous_event == user.event_id:
+                self._notify("remove", previous_event, user.id)
+            return added
+
+    def remove(self, user_id):
+        """
+        Remove a user from their event's pool.
+        Returns True if the user was in a pool, False otherwise.
+        """
+        with self._lock:
+            event_id = self._events.pop(user_id, None)
+            if event_id is None:
+                return False
+            self._pools[event_id].remove(user_id)
+            self._notify("remove", event_id, user_id)
+            return True
+
+    def remove_many(self, user_ids):
+        """Remove several users from their events' pools"""
+        with self._lock:
+            for user_id in user_ids:
+                self.remove(user_id)
+
+
+# Process-wide pools used by the matcher
+waiting_pool = EventPools()
+
+metrics.registry.gauge("matcher_waiting_users", "Users in the waiting pools", lambda: len(waiting_pool))
+
+def load_waiting_pool():
+    """
+    Rebuild the waiting pools of every event from the database.
+    Returns the number of users in the pools.
+    """
+    waiting_pool.rebuild(operations.get_waiting_users())
+    return len(waiting_pool)
+
+def sync_waiting_pool():
+    """
+    Bring the waiting pools in line with the database without rebuilding them, picking up
+    the users registered or matched by other processes, such as the import command.
+    Users already in the pools with the same registration are left untouched.
+    Returns a tuple (added, removed) with the number of users added and removed.
+    """
+    # Users in the pools before the read are committed, so missing from it means no longer waiting
+    known_ids = waiting_pool.user_ids()
+    waiting_ids = set()
+    added = 0
+    for user in operations.get_waiting_users():
+        waiting_ids.add(user.id)
+        entry = waiting_pool.get(user.id)
+        if entry is None or (entry.event_id, entry.skill, entry.experience) != (user.event_id, user.skill, user.experience):
+            added += waiting_pool.add(user)
+    
+    stale_ids = known_ids - waiting_ids
+    waiting_pool.remove_many(stale_ids)
+    return added, len(stale_ids)
@@ -0,0 +1,90 @@
+import logging
+import multiprocessing
+import sys
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+import config
+from src.services import optimizer
+from src.services.matcher import plan_batch_teams
+from src.services.pool import waiting_pool
+
+logger = logging.getLogger(__name__)
+
+# Matching modes accepted in MATCH_MODE
+MATCH_MODES = ("greedy", "optimized")
+
+# Worker processes planning the teams of different events in parallel
+_executor = None
+
+def check_match_mode(mode=None):
+    """
+    Check that the configured matching mode can run, so a misconfiguration stops the bot
+    at startup instead of silently matching in another mode.
+    Raises RuntimeError if the mode is unknown, or optimized without NumPy installed.
+    """
+    mode = mode or config.MATCH_MODE
+    if mode not in MATCH_MODES:
+        raise RuntimeError(f"Unknown MATCH_MODE {mode!r}, expected one of {', '.join(MATCH_MODES)}")
+    if mode == "optimized" and not optimizer.is_available():
+        raise RuntimeError("MATCH_MODE=optimized needs NumPy; install the requirements or use MATCH_MODE=greedy")
+
+def get_match_executor():
+    """
+    Get the process pool used for matching, starting it on first use.
+    Workers are spawned rather than forked, since the bot process runs threads.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=config.MATCH_WORKERS or None,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+def plan_shard(mode, users_by_skill, settings):
+    """
+    Plan the teams of one event with the given matching mode.
+    Returns a list of teams, each a list of users.
+    """
+    if mode == "optimized":
+        return optimizer.plan_optimized_teams(
+            users_by_skill,
+            settings["team_size"],
+            settings["required_skills"],
+            settings["experience_levels"]
+        )
+    return plan_batch_teams(users_by_skill, settings["team_size"], settings["required_skills"])
+
+def plan_event_teams(event_ids):
+    """
+    Plan the teams of several events from their waiting pools.
+    Each event is a shard planned by its own worker process; with a single
+    event, or MATCH_WORKERS=1, everything is planned in this process.
+    Returns a dictionary mapping each event to its planned teams.
+    """
+    shards = {}
+    for event_id in event_ids:
+        settings = config.get_event_settings(event_id)
+        snapshot = waiting_pool.pool(event_id).snapshot()
+        if sum(len(users) for users in snapshot.values()) >= settings["team_size"]:
+            shards[event_id] = (config.MATCH_MODE, snapshot, settings)
+    
+    if config.MATCH_WORKERS == 1 or len(shards) < 2:
+        return {event_id: plan_shard(*shard) for event_id, shard in shards.items()}
+    
+    executor = get_match_executor()
+    futures = {
+        event_id: executor.submit(plan_shard, *shard)
+        for event_id, shard in shards.items()
+    }
+    return {event_id: future.result() for event_id, future in futures.items()}
+
+def shutdown_match_executor():
+    """Stop the matching worker processes"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
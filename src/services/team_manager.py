@@ -1,54 +1,137 @@
 import sys
 import os
+from datetime import datetime, timedelta
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+import config
 from src.database import operations
-from src.services import matcher
+from src.database.cache import team_cache
+from src.database.session import unit_of_work
+from src.services.pool import waiting_pool
+
+def register_user(telegram_id, username, skill, experience, event_id=config.DEFAULT_EVENT):
+    """
+    Register a user for an event, or update their registration, and put them in the waiting pool.
+    Returns the user, or None if the user is already in a team.
+    """
+    user = operations.create_user(telegram_id, username, skill, experience, event_id)
+    if user is not None:
+        waiting_pool.add(user)
+    return user
 
 def create_team_from_users(users):
     """
     Create a team from a list of users.
-    Returns the created team.
+    Returns the ID of the created team, or None if a user is no longer available.
     """
-    # Create a new team
-    team = operations.create_team()
+    created_teams = create_teams_from_users([users], users[0].event_id)
+    return created_teams[0][0] if created_teams else None
+
+def create_teams_from_users(user_groups, event_id=config.DEFAULT_EVENT):
+    """
+    Create several teams of an event at once, in a single database transaction.
+    The users are locked first; groups with a user who is no longer waiting, or
+    who is being matched by another process, are skipped. Users skipped for a lock
+    stay in the waiting pool.
+    Returns a list of (team_id, users) tuples for the created teams.
+    """
+    user_ids = [user.id for users in user_groups for user in users]
+    
+    with unit_of_work():
+        available_ids, unavailable_ids = operations.lock_waiting_users(user_ids)
+        created_groups = [
+            users for users in user_groups
+            if all(user.id in available_ids for user in users)
+        ]
+        team_ids = operations.create_teams_bulk(
+            [[user.id for user in users] for users in created_groups],
+            event_id
+        )
     
-    # Add users to the team
-    for user in users:
-        operations.add_user_to_team(user.id, team.id)
-        # Mark user as not waiting
-        operations.update_user_waiting_status(user.id, False)
+    # Take the matched users, and the ones that are no longer available, out of the waiting pool
+    waiting_pool.remove_many(user.id for users in created_groups for user in users)
+    waiting_pool.remove_many(unavailable_ids)
     
-    return team
+    # The confirmation round starts from the cached snapshots, without reading the teams back
+    created_teams = list(zip(team_ids, created_groups))
+    for team_id, users in created_teams:
+        team_cache.put(build_new_team_info(team_id, event_id, users))
+    
+    return created_teams
 
 def handle_team_confirmation(user_id, team_id, confirmed):
     """
     Handle a user's confirmation for a team.
     Returns True if the team is now fully confirmed, False otherwise.
     """
-    # Get the user
-    user = operations.get_user_by_telegram_id(user_id)
-    if not user:
-        return False
-    
-    # Set the user's confirmation status
-    operations.set_member_confirmation(user.id, team_id, confirmed)
+    is_team_confirmed, _ = confirm_team_member(user_id, team_id, confirmed)
+    return is_team_confirmed
+
+def confirm_team_member(user_id, team_id, confirmed):
+    """
+    Handle a user's confirmation for a team. Completion is read from the team's
+    confirmation counter and the team itself from the team cache.
+    Returns a tuple (is_team_confirmed, team_info); team_info is None if the
+    user or the team could not be found.
+    """
+    try:
+        with unit_of_work():
+            # Get the user
+            user = operations.get_user_by_telegram_id(user_id)
+            if not user:
+                return False, None
+            
+            # Set the user's confirmation status, in the cached team too, and count it
+            counts = operations.set_member_confirmation(user.id, team_id, confirmed)
+            if counts is None:
+                return False, None
+            
+            if confirmed:
+                team_info = get_team_info(team_id)
+                if not team_info:
+                    return False, None
+                
+                # The team is complete once every member is counted; of concurrent answers
+                # seeing it complete, only the one that marks it confirmed reports it
+                confirmed_count, member_count = counts
+                if 0 < member_count <= confirmed_count and operations.set_team_confirmation(team_id, True):
+                    team_info["is_confirmed"] = True
+                    return True, team_info
+                return False, team_info
+            
+            # If the user declined, delete the team and return users to waiting list
+            team = operations.get_team_with_members(team_id)
+            if not team:
+                return False, None
+            team_info = build_team_info(team)
+            returning_users = [member.user for member in team.members]
+            operations.update_users_waiting_status([member.user_id for member in team.members], True)
+            operations.delete_team(team_id)
+    except Exception:
+        # The cached team may hold an answer that was rolled back
+        team_cache.invalidate(team_id)
+        raise
     
-    if not confirmed:
-        # If the user declined, delete the team and return users to waiting list
-        team_members = operations.get_team_members(team_id)
-        for member in team_members:
-            operations.update_user_waiting_status(member.user_id, True)
-        operations.delete_team(team_id)
-        return False
+    # Only put the users back in the pool once the transaction has committed
+    for returning_user in returning_users:
+        waiting_pool.add(returning_user)
+    return False, team_info
+
+def dissolve_expired_teams():
+    """
+    Dissolve the teams that were not fully confirmed within CONFIRMATION_TIMEOUT.
+    Their members go back to the waiting list and the waiting pool.
+    Returns a list of team information dictionaries for the dissolved teams.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=config.CONFIRMATION_TIMEOUT)
+    teams = operations.dissolve_expired_teams(cutoff)
     
-    # Check if all members have confirmed
-    if matcher.check_team_confirmation(team_id):
-        operations.set_team_confirmation(team_id, True)
-        return True
+    for team in teams:
+        for member in team.members:
+            waiting_pool.add(member.user)
     
-    return False
+    return [build_team_info(team) for team in teams]
 
 def create_team_chat(team_id, chat_id):
     """
@@ -59,19 +142,33 @@ def create_team_chat(team_id, chat_id):
 
 def get_team_info(team_id):
     """
-    Get information about a team.
+    Get information about a team, from the team cache while it waits for confirmation.
     Returns a dictionary with team information.
     """
-    team = operations.get_team_by_id(team_id)
+    team_info = team_cache.get(team_id)
+    if team_info is not None:
+        return team_info
+    
+    team = operations.get_team_with_members(team_id)
     if not team:
         return None
     
-    team_members = operations.get_team_members(team_id)
+    team_info = build_team_info(team)
+    if not team_info["is_confirmed"]:
+        team_cache.put(team_info)
+    return team_info
+
+def build_team_info(team):
+    """
+    Build the team information dictionary from a team loaded with its members.
+    Returns a dictionary with team information.
+    """
     members_info = []
     
-    for member in team_members:
+    for member in team.members:
         user = member.user
         members_info.append({
+            "user_id": user.id,
             "telegram_id": user.telegram_id,
             "username": user.username,
             "skill": user.skill,
@@ -81,7 +178,31 @@ def get_team_info(team_id):
     
     return {
         "team_id": team.id,
+        "event_id": team.event_id,
         "is_confirmed": team.is_confirmed,
         "chat_id": team.chat_id,
         "members": members_info
     }
+
+def build_new_team_info(team_id, event_id, users):
+    """
+    Build the team information dictionary of a team just created from users.
+    Returns a dictionary with team information.
+    """
+    return {
+        "team_id": team_id,
+        "event_id": event_id,
+        "is_confirmed": False,
+        "chat_id": None,
+        "members": [
+            {
+                "user_id": user.id,
+                "telegram_id": user.telegram_id,
+                "username": user.username,
+                "skill": user.skill,
+                "experience": user.experience,
+                "has_confirmed": False
+            }
+            for user in users
+        ]
+    }
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# The config module refuses to load without a bot token; tests never talk to Telegram
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:TEST")
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database_schema():
+    from src.database.schema import create_schema
+
+    create_schema()
@@ -0,0 +1,23 @@
+import asyncio
+
+from benchmarks import run
+
+
+def test_benchmark_suite_runs_on_a_small_pool():
+    results = asyncio.run(run.run_benchmarks([30], registrations=6, repeat=1, iterations=10))
+
+    assert [row["benchmark"] for row in results] == [
+        "find_potential_team", "create_team_from_users", "batch_match_teams", "button_callback"
+    ]
+    assert all(row["ops"] > 0 and row["p99_ms"] >= row["p50_ms"] > 0 for row in results)
+
+
+def test_benchmark_regressions_compare_p99_latency():
+    baseline = [{"benchmark": "batch_match_teams", "users": 100, "p99_ms": 10.0}]
+    results = [
+        {"benchmark": "batch_match_teams", "users": 100, "p99_ms": 14.0},
+        {"benchmark": "button_callback", "users": 100, "p99_ms": 99.0},
+    ]
+
+    assert run.find_regressions(results, baseline, 0.5) == []
+    assert run.find_regressions(results, baseline, 0.2) == [(results[0], baseline[0])]
@@ -0,0 +1,64 @@
+import pytest
+
+from src.bot import callbacks, keyboards
+
+
+def test_keyboard_callback_data_round_trips():
+    for markup in (keyboards.get_skill_keyboard(), keyboards.get_confirmation_keyboard(123456789)):
+        for row in markup.inline_keyboard:
+            for button in row:
+                assert len(button.callback_data.encode()) <= 64
+                assert callbacks.decode(button.callback_data) is not None
+
+    assert callbacks.decode(callbacks.encode(callbacks.CONFIRM, 42, True)) == (callbacks.CONFIRM, (42, True))
+    assert callbacks.decode(callbacks.encode(callbacks.SKILL, "spring:2024", 3)) == (callbacks.SKILL, ("spring:2024", 3))
+    assert callbacks.decode(callbacks.encode(callbacks.CANCEL_EDIT)) == (callbacks.CANCEL_EDIT, ())
+
+
+def test_legacy_callback_data_is_decoded():
+    assert callbacks.decode("skill_Design") == (callbacks.SKILL, (None, "Design"))
+    assert callbacks.decode("exp_1 year") == (callbacks.EXPERIENCE, (None, "1 year"))
+    assert callbacks.decode("confirm_7_no") == (callbacks.CONFIRM, (7, False))
+    assert callbacks.decode("edit_registration") == (callbacks.EDIT_REGISTRATION, ())
+
+
+def test_malformed_callback_data_is_rejected():
+    for data in ("1:z", "1:s", "1:s:0", "1:s:default:x", "1:u:1", "1:c:7:yes", "2:s:0", "confirm_x_yes", "anything"):
+        assert callbacks.decode(data) is None
+    with pytest.raises(ValueError):
+        callbacks.encode(callbacks.SKILL, "e" * 64, 0)
+
+    assert callbacks.resolve_option(["Design", "Backend"], 1) == "Backend"
+    assert callbacks.resolve_option(["Design", "Backend"], 2) is None
+    assert callbacks.resolve_option(["Design", "Backend"], "Frontend") is None
+
+
+def test_skill_buttons_keep_their_event_when_the_state_is_gone(monkeypatch):
+    import asyncio
+    from types import SimpleNamespace
+
+    import config
+    from src.bot import handlers
+    from src.bot.state_store import state_store
+
+    monkeypatch.setitem(config.EVENTS, "design-jam", {"required_skills": ["UX", "UI"]})
+    replies = []
+
+    async def edit_message_text(text, reply_markup=None, **kwargs):
+        replies.append(reply_markup)
+
+    async def press():
+        await state_store.delete(900)
+        query = SimpleNamespace(
+            from_user=SimpleNamespace(id=900, username="ux"),
+            data=keyboards.get_skill_keyboard("design-jam").inline_keyboard[1][0].callback_data,
+            answer=lambda *args, **kwargs: asyncio.sleep(0),
+            edit_message_text=edit_message_text,
+        )
+        await handlers.button_callback(SimpleNamespace(callback_query=query), SimpleNamespace())
+        return await state_store.get(900)
+
+    state = asyncio.run(press())
+
+    assert (state["event"], state["skill"]) == ("design-jam", "UI")
+    assert replies == [keyboards.get_experience_keyboard("design-jam")]
@@ -0,0 +1,258 @@
+import pytest
+
+from src.database import operations
+from src.database.cache import team_cache, user_cache
+from src.database.models import Team, TeamMember, User
+from src.database.session import unit_of_work
+
+
+@pytest.fixture(autouse=True)
+def clean_database():
+    with unit_of_work() as db:
+        db.query(TeamMember).delete()
+        db.query(Team).delete()
+        db.query(User).delete()
+    user_cache.clear()
+    team_cache.clear()
+    yield
+
+
+def test_create_teams_bulk_assigns_members_and_clears_waiting():
+    users = [operations.create_user(100 + i, f"user{i}", "Design", "1 year") for i in range(6)]
+    user_ids = [user.id for user in users]
+
+    team_ids = operations.create_teams_bulk([user_ids[:3], user_ids[3:]])
+
+    assert len(team_ids) == 2
+    assert [m.user_id for m in operations.get_team_members(team_ids[0])] == user_ids[:3]
+    assert [m.user_id for m in operations.get_team_members(team_ids[1])] == user_ids[3:]
+    assert operations.get_waiting_users() == []
+
+
+def test_create_teams_bulk_with_no_groups():
+    assert operations.create_teams_bulk([]) == []
+
+
+def test_unit_of_work_rolls_back_on_error():
+    with pytest.raises(RuntimeError):
+        with unit_of_work():
+            operations.create_user(200, "user", "Design", "1 year")
+            raise RuntimeError("boom")
+
+    assert operations.get_user_by_telegram_id(200) is None
+
+
+def test_nested_operations_share_one_session():
+    with unit_of_work() as db:
+        user = operations.create_user(201, "user", "Design", "1 year")
+        assert operations.get_user_by_telegram_id(201) is user
+        assert user in db
+
+    assert operations.get_user_by_telegram_id(201).skill == "Design"
+
+
+def test_get_team_with_members_loads_users():
+    users = [operations.create_user(300 + i, f"user{i}", "Design", "1 year") for i in range(3)]
+    team_id = operations.create_teams_bulk([[user.id for user in users]])[0]
+
+    team = operations.get_team_with_members(team_id)
+
+    # The session is closed, so this only works if everything was loaded eagerly
+    assert [member.user.telegram_id for member in team.members] == [300, 301, 302]
+
+
+def test_confirm_team_member_reports_full_confirmation():
+    from src.services import team_manager
+
+    users = [operations.create_user(400 + i, f"user{i}", "Design", "1 year") for i in range(3)]
+    team_id = operations.create_teams_bulk([[user.id for user in users]])[0]
+
+    results = [team_manager.confirm_team_member(400 + i, team_id, True) for i in range(3)]
+
+    assert [is_confirmed for is_confirmed, _ in results] == [False, False, True]
+    team_info = results[-1][1]
+    assert team_info["is_confirmed"]
+    assert operations.get_team_by_id(team_id).is_confirmed
+
+
+def test_confirmation_round_reads_the_team_from_the_cache():
+    from src.services import team_manager
+
+    users = [operations.create_user(450 + i, f"user{i}", "Design", "1 year") for i in range(3)]
+    [(team_id, _)] = team_manager.create_teams_from_users([users])
+    before = team_cache.stats()
+
+    results = [team_manager.confirm_team_member(450 + i, team_id, True) for i in range(3)]
+
+    assert [is_confirmed for is_confirmed, _ in results] == [False, False, True]
+    assert team_cache.stats()["hits"] == before["hits"] + 3
+    assert team_cache.stats()["misses"] == before["misses"]
+    # A confirmed team leaves the cache
+    assert team_cache.get(team_id) is None
+    assert team_manager.get_team_info(team_id)["is_confirmed"]
+
+
+def test_confirmation_counter_counts_each_member_once():
+    from src.services import matcher
+
+    users = [operations.create_user(470 + i, f"user{i}", "Design", "1 year") for i in range(2)]
+    team_id = operations.create_teams_bulk([[user.id for user in users]])[0]
+
+    assert operations.set_member_confirmation(users[0].id, team_id, True) == (1, 2)
+    assert operations.set_member_confirmation(users[0].id, team_id, True) == (1, 2)
+    assert not matcher.check_team_confirmation(team_id)
+    assert operations.set_member_confirmation(users[1].id, team_id, True) == (2, 2)
+    assert matcher.check_team_confirmation(team_id)
+    assert operations.set_member_confirmation(users[1].id, team_id + 1, True) is None
+
+    # Only the first caller marks the team confirmed
+    assert operations.set_team_confirmation(team_id, True)
+    assert not operations.set_team_confirmation(team_id, True)
+
+
+def test_user_lookups_are_cached_until_a_write():
+    user = operations.create_user(500, "user", "Design", "1 year")
+    before = user_cache.stats()
+
+    operations.get_user_by_telegram_id(500)
+    operations.get_user_by_telegram_id(500)
+    after_reads = user_cache.stats()
+
+    operations.create_teams_bulk([[user.id]])
+    refreshed = operations.get_user_by_telegram_id(500)
+
+    assert after_reads["misses"] - before["misses"] == 1
+    assert after_reads["hits"] - before["hits"] == 1
+    assert refreshed.is_waiting is False
+
+
+@pytest.fixture
+def file_database(tmp_path, monkeypatch):
+    """
+    Run the units of work on a file database, so other threads read what was committed
+    through their own connection. Yields the session factory.
+    """
+    from sqlalchemy.orm import sessionmaker
+    from src.database import session
+    from src.database.models import Base
+
+    file_engine = session.create_db_engine(f"sqlite:///{tmp_path / 'bot.db'}")
+    Base.metadata.create_all(bind=file_engine)
+    factory = sessionmaker(bind=file_engine, autoflush=False, expire_on_commit=False)
+    monkeypatch.setattr(session, "SessionLocal", factory)
+    yield factory
+
+
+def read_user_in_another_thread(telegram_id):
+    import threading
+
+    reader = threading.Thread(target=operations.get_user_by_telegram_id, args=(telegram_id,))
+    reader.start()
+    reader.join()
+
+
+def test_lookups_during_a_write_are_not_cached_past_its_commit(file_database):
+    user = operations.create_user(503, "user", "Design", "1 year")
+    with unit_of_work():
+        operations.create_teams_bulk([[user.id]])
+        read_user_in_another_thread(503)
+
+    assert operations.get_user_by_telegram_id(503).is_waiting is False
+
+
+def test_lookups_during_a_registration_update_are_not_cached_past_its_commit(file_database):
+    from sqlalchemy import event
+
+    operations.create_user(505, "user", "Design", "1 year")
+
+    # Look the user up once the update is written, just before it commits
+    @event.listens_for(file_database, "before_commit", once=True)
+    def before_commit(session):
+        read_user_in_another_thread(505)
+
+    operations.create_user(505, "user", "Backend Development", "1 year")
+
+    assert operations.get_user_by_telegram_id(505).skill == "Backend Development"
+
+
+def test_unknown_users_are_cached_until_they_register():
+    assert operations.get_user_by_telegram_id(501) is None
+    assert operations.get_user_by_telegram_id(501) is None
+
+    operations.create_user(501, "user", "Design", "1 year")
+
+    assert operations.get_user_by_telegram_id(501).skill == "Design"
+
+
+def test_create_user_updates_existing_registration():
+    first = operations.create_user(502, "user", "Design", "1 year")
+
+    updated = operations.create_user(502, "user", "Backend Development", "2 years")
+
+    assert updated.id == first.id
+    assert (updated.skill, updated.experience, updated.is_waiting) == ("Backend Development", "2 years", True)
+    assert updated.registration_time == first.registration_time
+
+
+def test_create_user_keeps_users_in_a_team():
+    user = operations.create_user(504, "user", "Design", "1 year")
+    operations.create_teams_bulk([[user.id]])
+
+    assert operations.create_user(504, "user", "Backend Development", "2 years") is None
+    stored = operations.get_user_by_telegram_id(504)
+    assert (stored.skill, stored.is_waiting) == ("Design", False)
+
+
+def test_create_teams_skips_groups_with_unavailable_users():
+    from src.services import team_manager
+
+    users = [operations.create_user(600 + i, f"user{i}", "Design", "1 year") for i in range(6)]
+    operations.update_user_waiting_status(users[4].id, False)
+
+    created = team_manager.create_teams_from_users([users[:3], users[3:]])
+
+    assert [[user.id for user in members] for _, members in created] == [[user.id for user in users[:3]]]
+    assert [user.id for user in operations.get_waiting_users()] == [users[3].id, users[5].id]
+
+
+def test_users_skipped_for_a_lock_stay_in_the_waiting_pool(monkeypatch):
+    from src.services import team_manager
+    from src.services.pool import waiting_pool
+
+    waiting_pool.clear()
+    users = [operations.create_user(650 + i, f"user{i}", "Design", "1 year") for i in range(6)]
+    for user in users:
+        waiting_pool.add(user)
+    operations.update_user_waiting_status(users[4].id, False)
+    # Another transaction holds the lock on users[1]
+    lock_waiting_users = operations.lock_waiting_users
+    monkeypatch.setattr(
+        operations, "lock_waiting_users",
+        lambda user_ids: tuple(
+            ids - {users[1].id} for ids in lock_waiting_users(user_ids)
+        )
+    )
+
+    assert team_manager.create_teams_from_users([users[:3], users[3:]]) == []
+
+    assert users[1].id in waiting_pool
+    assert users[4].id not in waiting_pool
+    assert len(waiting_pool) == 5
+    waiting_pool.clear()
+
+
+def test_dissolve_expired_teams_returns_members_to_waiting_list():
+    from datetime import datetime, timedelta
+
+    users = [operations.create_user(700 + i, f"user{i}", "Design", "1 year") for i in range(6)]
+    expired_id, confirmed_id = operations.create_teams_bulk([[u.id for u in users[:3]], [u.id for u in users[3:]]])
+    operations.set_team_confirmation(confirmed_id, True)
+
+    dissolved = operations.dissolve_expired_teams(datetime.utcnow() + timedelta(seconds=1))
+
+    assert [team.id for team in dissolved] == [expired_id]
+    assert [member.user.telegram_id for member in dissolved[0].members] == [700, 701, 702]
+    assert operations.get_team_by_id(expired_id) is None
+    assert operations.get_team_members(expired_id) == []
+    assert [user.id for user in operations.get_waiting_users()] == [u.id for u in users[:3]]
+    assert operations.dissolve_expired_teams(datetime.utcnow() - timedelta(hours=1)) == []
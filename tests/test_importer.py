@@ -0,0 +1,76 @@
+import pytest
+
+from src.database import operations
+from src.database.cache import team_cache, user_cache
+from src.database.models import Team, TeamMember, User
+from src.database.session import unit_of_work
+from src.services import importer
+from src.services.pool import waiting_pool
+
+
+@pytest.fixture(autouse=True)
+def clean_database():
+    with unit_of_work() as db:
+        db.query(TeamMember).delete()
+        db.query(Team).delete()
+        db.query(User).delete()
+    user_cache.clear()
+    team_cache.clear()
+    waiting_pool.clear()
+    yield
+    waiting_pool.clear()
+
+
+def test_csv_import_upserts_valid_rows_and_reports_invalid_ones(tmp_path):
+    export = tmp_path / "signups.csv"
+    export.write_text(
+        "telegram_id,username,skill,experience\n"
+        "1,@ada,Design,1 year\n"
+        "2,bob,Cooking,1 year\n"
+        "3,cy,Backend Development,2 years\n"
+        "1,ada,Frontend Development,2 years\n"
+        "x,nobody,Design,1 year\n"
+    )
+
+    result = importer.import_users(importer.read_rows(str(export)), chunk_size=2)
+
+    assert result["imported"] == 3
+    assert result["skipped"] == [(3, "unknown skill 'Cooking'"), (6, "invalid telegram_id 'x'")]
+    ada = operations.get_user_by_telegram_id(1)
+    assert (ada.username, ada.skill, ada.experience) == ("ada", "Frontend Development", "2 years")
+    assert ada.id in waiting_pool and len(waiting_pool) == 2
+
+
+def test_jsonl_import_leaves_users_in_teams_untouched(tmp_path):
+    member = operations.create_user(7, "member", "Design", "1 year")
+    operations.create_teams_bulk([[member.id]])
+    export = tmp_path / "signups.jsonl"
+    export.write_text(
+        '{"telegram_id": 7, "username": "member", "skill": "Backend Development", "experience": "1 year"}\n'
+        '{"telegram_id": 8, "username": "new", "skill": "Design", "experience": "1 year", "event": "unknown"}\n'
+        "not json\n"
+    )
+
+    result = importer.import_users(importer.read_rows(str(export)))
+
+    assert result["imported"] == 0
+    assert [line for line, _ in result["skipped"]] == [2, 3]
+    user = operations.get_user_by_telegram_id(7)
+    assert user.skill == "Design" and not user.is_waiting
+
+
+def test_pool_sync_picks_up_users_written_by_another_process():
+    from src.services.pool import sync_waiting_pool
+
+    matched, waiting = [operations.create_user(20 + i, f"user{i}", "Design", "1 year") for i in range(2)]
+    waiting_pool.add(matched)
+    # As the import command would, in its own process
+    operations.upsert_users([{
+        "telegram_id": 30, "username": "imported", "event_id": "default",
+        "skill": "Backend Development", "experience": "1 year", "registration_time": matched.registration_time,
+    }])
+    operations.create_teams_bulk([[matched.id]])
+
+    assert sync_waiting_pool() == (2, 1)
+    assert waiting.id in waiting_pool and matched.id not in waiting_pool and len(waiting_pool) == 2
+    assert sync_waiting_pool() == (0, 0)
@@ -0,0 +1,47 @@
+import json
+import logging
+
+from src.logging_setup import JsonFormatter, SamplingFilter, configure_logging
+
+
+def make_record(message, *args, **extra):
+    record = logging.LogRecord("src.bot.handlers", logging.INFO, __file__, 1, message, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_adds_extra_fields():
+    record = make_record("Start command from user %s", 42, user_id=42, sample=True)
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["message"] == "Start command from user 42"
+    assert entry["user_id"] == 42
+    assert entry["level"] == "INFO" and "sample" not in entry
+
+
+def test_sampling_filter_only_thins_out_sampled_records():
+    sampling = SamplingFilter(3)
+
+    sampled = [sampling.filter(make_record("event", sample=True)) for _ in range(6)]
+
+    assert sampled == [True, False, False, True, False, False]
+    assert sampling.filter(make_record("error"))
+
+
+def test_configured_logging_writes_from_the_listener_thread(capsys):
+    root = logging.getLogger()
+    previous_handlers, previous_level = list(root.handlers), root.level
+    listener = configure_logging(level="INFO", log_format="json", sample_every=1)
+    try:
+        logging.getLogger("src.test").info("Loaded %d waiting users", 3, extra={"pool": "default"})
+    finally:
+        listener.stop()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in previous_handlers:
+            root.addHandler(handler)
+        root.setLevel(previous_level)
+
+    entry = json.loads(capsys.readouterr().err.strip().splitlines()[-1])
+    assert entry["message"] == "Loaded 3 waiting users" and entry["pool"] == "default"
@@ -0,0 +1,242 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import pytest
+
+import config
+from src.services import matcher, optimizer, sharding
+from src.services.matcher import plan_batch_teams
+from src.services.pool import EventPools, WaitingPool
+
+SKILLS = ["Frontend Development", "Backend Development", "Design"]
+FakeUser = namedtuple("FakeUser", ["id", "telegram_id", "username", "event_id", "skill", "experience", "registration_time"])
+
+START = datetime(2024, 1, 1)
+
+def make_user(user_id, skill, event_id="default", experience="1 year"):
+    return FakeUser(user_id, 1000 + user_id, f"user{user_id}", event_id, skill, experience, START + timedelta(minutes=user_id))
+
+
+def test_pool_picks_one_user_per_skill():
+    pool = WaitingPool(SKILLS)
+    pool.rebuild([
+        make_user(1, "Design"),
+        make_user(2, "Frontend Development"),
+        make_user(3, "Frontend Development"),
+        make_user(4, "Backend Development"),
+    ])
+
+    team = pool.find_team(3)
+
+    assert [member.id for member in team] == [2, 4, 1]
+    assert len(pool) == 4
+
+
+def test_pool_fills_missing_skill_with_next_waiting_user():
+    pool = WaitingPool(SKILLS)
+    pool.rebuild([make_user(1, "Design"), make_user(2, "Design"), make_user(3, "Design")])
+
+    team = pool.find_team(3)
+
+    assert [member.id for member in team] == [1, 2, 3]
+
+
+def test_pool_needs_enough_users():
+    pool = WaitingPool(SKILLS)
+    pool.rebuild([make_user(1, "Design"), make_user(2, "Backend Development")])
+
+    assert pool.find_team(3) is None
+
+
+def test_pool_keeps_registration_order_when_users_return():
+    pool = WaitingPool(SKILLS)
+    pool.rebuild([make_user(1, "Design"), make_user(3, "Design")])
+
+    pool.add(make_user(2, "Design"))
+
+    assert [entry.id for entry in pool.snapshot()["Design"]] == [1, 2, 3]
+
+
+def test_pool_moves_user_on_edit_and_removes_on_team():
+    pool = WaitingPool(SKILLS)
+    pool.rebuild([make_user(1, "Design"), make_user(2, "Design")])
+
+    pool.add(make_user(1, "Backend Development"))
+    pool.remove_many([2])
+
+    snapshot = pool.snapshot()
+    assert snapshot["Design"] == []
+    assert [entry.id for entry in snapshot["Backend Development"]] == [1]
+    assert 2 not in pool
+
+
+def test_batch_plan_forms_balanced_teams_first():
+    users = [make_user(i, SKILLS[i % 3]) for i in range(6)] + [make_user(6, "Design"), make_user(7, "Design")]
+    pool = WaitingPool(SKILLS)
+    pool.rebuild(users)
+
+    teams = plan_batch_teams(pool.snapshot(), 3, SKILLS)
+
+    assert [[member.id for member in team] for team in teams] == [[0, 1, 2], [3, 4, 5]]
+
+
+def test_batch_plan_uses_replacements_and_leftovers():
+    users = [make_user(1, "Design"), make_user(2, "Design"), make_user(3, "Design"),
+             make_user(4, "Backend Development"), make_user(5, "Design"), make_user(6, "Design")]
+    pool = WaitingPool(SKILLS)
+    pool.rebuild(users)
+
+    teams = plan_batch_teams(pool.snapshot(), 3, SKILLS)
+
+    assert [[member.id for member in team] for team in teams] == [[4, 1, 2], [3, 5, 6]]
+
+
+def test_optimized_plan_balances_experience_and_skips_newest_user():
+    pytest.importorskip("numpy")
+    senior, junior = "More than 2 years", "1 year"
+    users = ([make_user(i, SKILLS[i % 3], experience=senior) for i in range(3)]
+             + [make_user(i, SKILLS[i % 3], experience=junior) for i in range(3, 6)]
+             + [make_user(6, "Design")])
+    pool = WaitingPool(SKILLS)
+    pool.rebuild(users)
+
+    teams = optimizer.plan_optimized_teams(pool.snapshot(), 3, SKILLS, config.EXPERIENCE_LEVELS)
+
+    assert len(teams) == 2
+    assert all(sorted(member.skill for member in team) == sorted(SKILLS) for team in teams)
+    assert all({member.experience for member in team} == {senior, junior} for team in teams)
+    assert 6 not in {member.id for team in teams for member in team}
+
+
+def test_optimized_plan_leaves_out_only_the_newest_users_of_a_large_pool():
+    pytest.importorskip("numpy")
+    from benchmarks.compare_matchers import measure
+    from benchmarks.synthetic import make_pool
+
+    pool = make_pool(20000, 0.3)
+
+    greedy = measure(plan_batch_teams(pool), pool)
+    optimized = measure(optimizer.plan_optimized_teams(pool), pool)
+
+    # One registration per minute: fewer than a team's worth of users are left, all recent
+    assert optimized["max_unmatched_wait_min"] < config.TEAM_SIZE
+    assert optimized["max_unmatched_wait_min"] <= greedy["max_unmatched_wait_min"]
+    assert optimized["coverage"] == pytest.approx(greedy["coverage"], abs=0.001)
+
+
+def test_event_pools_route_and_move_users_between_events(monkeypatch):
+    monkeypatch.setitem(config.EVENTS, "spring", {"team_size": 2})
+    pools = EventPools()
+    pools.rebuild([make_user(1, "Design"), make_user(2, "Design", "spring")])
+
+    assert 1 in pools.pool("default") and 2 in pools.pool("spring")
+
+    pools.add(make_user(1, "Backend Development", "spring"))
+
+    assert 1 not in pools.pool("default")
+    assert [member.id for member in pools.pool("spring").find_team(2)] == [1, 2]
+
+
+def test_sharded_planning_matches_each_event_separately(monkeypatch):
+    monkeypatch.setitem(config.EVENTS, "spring", {"team_size": 2})
+    monkeypatch.setattr(config, "MATCH_WORKERS", 2)
+    pools = EventPools()
+    pools.rebuild([make_user(user_id, SKILLS[user_id % 3]) for user_id in range(1, 7)]
+                  + [make_user(user_id, "Design", "spring") for user_id in range(7, 12)])
+    monkeypatch.setattr(sharding, "waiting_pool", pools)
+
+    try:
+        planned = sharding.plan_event_teams(["default", "spring"])
+    finally:
+        sharding.shutdown_match_executor()
+
+    assert [[user.id for user in team] for team in planned["default"]] == [[3, 1, 2], [6, 4, 5]]
+    assert [[user.id for user in team] for team in planned["spring"]] == [[7, 8], [9, 10]]
+
+
+def test_incremental_matcher_only_plans_events_that_can_complete_a_team(monkeypatch):
+    monkeypatch.setitem(config.EVENTS, "spring", {"team_size": 2})
+    pools = EventPools()
+    incremental = matcher.IncrementalMatcher(pools)
+    planned = []
+    monkeypatch.setattr(matcher, "batch_match_teams", lambda event_ids: planned.append(event_ids) or [])
+
+    pools.add(make_user(1, "Design"))
+    pools.add(make_user(2, "Design", "spring"))
+    pools.add(make_user(3, "Backend Development"))
+    assert incremental.match() == [] and planned == []
+
+    pools.remove(3)
+    assert not incremental.has_pending()
+
+    pools.add(make_user(4, "Frontend Development", "spring"))
+    incremental.match()
+    assert planned == [["spring"]]
+    # The pool still holds a full team, as if the planned team had been skipped
+    assert incremental.has_pending()
+
+
+def test_incremental_matcher_keeps_events_of_a_failed_run(monkeypatch):
+    monkeypatch.setitem(config.EVENTS, "spring", {"team_size": 2})
+    pools = EventPools()
+    incremental = matcher.IncrementalMatcher(pools)
+
+    def fail(event_ids):
+        raise RuntimeError("database unavailable")
+    monkeypatch.setattr(matcher, "batch_match_teams", fail)
+
+    pools.add(make_user(1, "Design", "spring"))
+    pools.add(make_user(2, "Backend Development", "spring"))
+    with pytest.raises(RuntimeError):
+        incremental.match()
+
+    assert incremental.has_pending()
+
+
+def test_match_mode_is_checked_at_startup(monkeypatch):
+    sharding.check_match_mode("greedy")
+    with pytest.raises(RuntimeError):
+        sharding.check_match_mode("fastest")
+
+    monkeypatch.setattr(optimizer, "np", None)
+    with pytest.raises(RuntimeError, match="NumPy"):
+        sharding.check_match_mode("optimized")
+
+
+def test_incremental_matcher_runs_alongside_pool_changes(monkeypatch):
+    import threading
+    import time
+
+    monkeypatch.setitem(config.EVENTS, "spring", {"team_size": 2})
+    matched = threading.Event()
+    checking = threading.Event()
+
+    class SlowPools(EventPools):
+        def pool(self, event_id=config.DEFAULT_EVENT):
+            # Let a registration take the pools' lock while the matcher checks the pools after its run
+            if matched.is_set() and threading.current_thread().name == "matcher":
+                checking.set()
+                time.sleep(0.2)
+            return super().pool(event_id)
+
+    pools = SlowPools()
+    incremental = matcher.IncrementalMatcher(pools)
+    monkeypatch.setattr(matcher, "batch_match_teams", lambda event_ids: matched.set() or [])
+    pools.add(make_user(1, "Design", "spring"))
+    pools.add(make_user(2, "Backend Development", "spring"))
+
+    def register():
+        checking.wait(5)
+        pools.add(make_user(3, "Design", "spring"))
+
+    threads = [
+        threading.Thread(target=incremental.match, name="matcher", daemon=True),
+        threading.Thread(target=register, daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert not any(thread.is_alive() for thread in threads), "deadlock between the matcher and the pools"
+    assert len(pools) == 3 and incremental.has_pending()
@@ -0,0 +1,22 @@
+from src.bot import keyboards, messages
+
+
+def test_keyboards_are_built_once_and_shared():
+    assert keyboards.get_skill_keyboard() is keyboards.get_skill_keyboard()
+    assert keyboards.get_experience_keyboard("unknown-event") is keyboards.get_experience_keyboard("unknown-event")
+    assert keyboards.get_confirmation_keyboard(7) is keyboards.get_confirmation_keyboard(7)
+    assert keyboards.get_confirmation_keyboard(7).inline_keyboard[0][1].callback_data == "1:c:7:0"
+
+
+def test_teammates_messages_list_everyone_but_the_reader():
+    team_info = {"members": [
+        {"telegram_id": 1, "username": "ada", "skill": "Design", "experience": "1 year"},
+        {"telegram_id": 2, "username": None, "skill": "Backend Development", "experience": "2 years"},
+    ]}
+
+    (first_id, first), (second_id, second) = messages.get_teammates_messages(team_info)
+
+    assert (first_id, second_id) == (1, 2)
+    assert "• @No username - Backend Development (2 years)\n" in first and "@ada" not in first
+    assert "• @ada - Design (1 year)\n" in second
+    assert first.startswith("🎉 Your hackathon team is confirmed!")
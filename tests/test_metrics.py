@@ -0,0 +1,34 @@
+import asyncio
+
+from src import metrics
+from src.database import async_operations, operations
+
+
+def test_histogram_renders_cumulative_buckets_and_estimates_quantiles():
+    registry = metrics.MetricsRegistry()
+    histogram = registry.histogram("work_seconds", "Work", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value, kind="test")
+
+    lines = registry.render().splitlines()
+
+    assert 'work_seconds_bucket{kind="test",le="0.1"} 1' in lines
+    assert 'work_seconds_bucket{kind="test",le="1.0"} 3' in lines
+    assert 'work_seconds_bucket{kind="test",le="+Inf"} 4' in lines
+    assert 'work_seconds_count{kind="test"} 4' in lines
+    assert histogram.quantile(0.5, kind="test") == 1.0
+    assert histogram.quantile(0.99, kind="test") == float("inf")
+
+
+def test_tracked_handlers_count_queries_run_in_the_executor():
+    @metrics.track_update
+    async def lookup_handler(update, context):
+        await async_operations.run(operations.get_waiting_users)
+        await async_operations.run(operations.get_waiting_users)
+
+    queries_before = metrics.update_queries.count(handler="lookup_handler")
+    asyncio.run(lookup_handler(None, None))
+
+    assert metrics.update_latency.count(handler="lookup_handler") == 1
+    assert metrics.update_queries.count(handler="lookup_handler") == queries_before + 1
+    assert metrics.update_queries.quantile(1.0, handler="lookup_handler") == 2
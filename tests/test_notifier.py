@@ -0,0 +1,48 @@
+import asyncio
+
+from telegram.error import BadRequest, RetryAfter, TimedOut
+
+from src.bot.notifier import NotificationDispatcher
+
+
+class FakeBot:
+    def __init__(self, failures=None):
+        self.failures = dict(failures or {})
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        failures = self.failures.get(chat_id)
+        if failures:
+            raise failures.pop(0)
+        self.sent.append((chat_id, text))
+
+
+def make_dispatcher(max_retries=2):
+    return NotificationDispatcher(global_rate=1000, per_chat_rate=1000, max_retries=max_retries, backoff=0)
+
+
+def test_send_many_delivers_every_message():
+    bot = FakeBot()
+
+    results = asyncio.run(make_dispatcher().send_many(bot, [
+        {"chat_id": chat_id, "text": "hello"} for chat_id in range(10)
+    ]))
+
+    assert results == [True] * 10
+    assert sorted(chat_id for chat_id, _ in bot.sent) == list(range(10))
+
+
+def test_send_retries_after_flood_control_and_timeouts():
+    bot = FakeBot({1: [RetryAfter(0), TimedOut()]})
+
+    assert asyncio.run(make_dispatcher().send(bot, 1, "hello"))
+    assert bot.sent == [(1, "hello")]
+
+
+def test_send_gives_up_on_bad_requests_and_after_max_retries():
+    bot = FakeBot({1: [BadRequest("chat not found")], 2: [TimedOut(), TimedOut(), TimedOut()]})
+    dispatcher = make_dispatcher()
+
+    assert not asyncio.run(dispatcher.send(bot, 1, "hello"))
+    assert not asyncio.run(dispatcher.send(bot, 2, "hello"))
+    assert bot.sent == []
@@ -0,0 +1,61 @@
+import asyncio
+from types import SimpleNamespace
+
+from src.bot.scheduler import MatchScheduler
+
+
+class FakeJobQueue:
+    """Runs jobs on the event loop after their delay, like the JobQueue does"""
+
+    def __init__(self, context):
+        self.context = context
+        self.scheduled = 0
+
+    def run_once(self, callback, when, name=None):
+        self.scheduled += 1
+        loop = asyncio.get_running_loop()
+        loop.call_later(when, lambda: asyncio.ensure_future(callback(self.context)))
+
+
+def test_requests_in_the_debounce_window_are_coalesced():
+    runs = []
+
+    async def scenario():
+        async def match(context):
+            runs.append(context.name)
+
+        scheduler = MatchScheduler(match, debounce=0.01)
+        job_queue = FakeJobQueue(SimpleNamespace(name="tick"))
+        for _ in range(5):
+            scheduler.request(job_queue)
+        await asyncio.sleep(0.05)
+
+        scheduler.request(job_queue)
+        await asyncio.sleep(0.05)
+        return job_queue.scheduled
+
+    assert asyncio.run(scenario()) == 2
+    assert runs == ["tick", "tick"]
+
+
+def test_runs_never_overlap():
+    active = []
+    overlaps = []
+
+    async def scenario():
+        async def match(context):
+            active.append(1)
+            overlaps.append(len(active))
+            await asyncio.sleep(0.02)
+            active.pop()
+
+        scheduler = MatchScheduler(match, debounce=0)
+        job_queue = FakeJobQueue(None)
+        scheduler.request(job_queue)
+        await asyncio.sleep(0.005)
+        scheduler.request(job_queue)
+        await asyncio.sleep(0.06)
+
+    asyncio.run(scenario())
+
+    assert overlaps == [1, 1]
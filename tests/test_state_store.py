@@ -0,0 +1,54 @@
+import asyncio
+
+from src.bot.state_store import DatabaseStateStore, MemoryStateStore
+from src.database import operations
+
+
+def test_memory_store_evicts_least_recently_used():
+    async def scenario():
+        store = MemoryStateStore(ttl=60, max_entries=2)
+        await store.set(1, {"step": "skill_selection"})
+        await store.set(2, {"step": "skill_selection"})
+        await store.get(1)
+        await store.set(3, {"step": "skill_selection"})
+        return [await store.get(user_id) for user_id in (1, 2, 3)], len(store)
+
+    states, size = asyncio.run(scenario())
+
+    assert states == [{"step": "skill_selection"}, None, {"step": "skill_selection"}]
+    assert size == 2
+
+
+def test_memory_store_expires_entries():
+    async def scenario():
+        store = MemoryStateStore(ttl=-1, max_entries=10)
+        await store.set(1, {"step": "skill_selection"})
+        return await store.get(1), len(store)
+
+    assert asyncio.run(scenario()) == (None, 0)
+
+
+def test_database_store_round_trip_and_purge():
+    async def scenario():
+        store = DatabaseStateStore(ttl=60, max_entries=1)
+        await store.set(1, {"step": "experience_selection", "skill": "Design"})
+        loaded = await store.get(1)
+        await store.set(2, {"step": "skill_selection"})
+        await store.delete(1)
+        deleted = await store.get(1)
+        return loaded, deleted
+
+    loaded, deleted = asyncio.run(scenario())
+
+    assert loaded == {"step": "experience_selection", "skill": "Design"}
+    assert deleted is None
+
+
+def test_purge_keeps_newest_states():
+    for user_id in (10, 11, 12):
+        operations.save_registration_state(user_id, "{}")
+
+    operations.purge_registration_states(max_age=60, max_entries=1)
+
+    assert operations.get_registration_state(12, 60) == "{}"
+    assert operations.get_registration_state(10, 60) is None
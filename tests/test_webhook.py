@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+from telegram.ext import ApplicationBuilder
+from tornado.httpclient import AsyncHTTPClient
+from tornado.httpserver import HTTPServer
+from tornado.testing import bind_unused_port
+
+from src.bot.webhook import build_webhook_app
+
+SECRET = "local-secret"
+
+def make_update(update_id, text="/start"):
+    """Build the JSON body Telegram would post for a private message"""
+    user = {"id": 42, "is_bot": False, "first_name": "Test", "username": "tester"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1700000000,
+            "chat": {"id": 42, "type": "private"},
+            "from": user,
+            "text": text,
+        },
+    }
+
+
+def run_against_server(scenario):
+    """Start the webhook server on a free local port and run a scenario against it"""
+    async def main():
+        application = ApplicationBuilder().token("123456:TEST").updater(None).build()
+        sock, port = bind_unused_port()
+        server = HTTPServer(build_webhook_app(application, "/telegram", SECRET))
+        server.add_sockets([sock])
+        try:
+            return await scenario(application, f"http://127.0.0.1:{port}")
+        finally:
+            server.stop()
+
+    return asyncio.run(main())
+
+async def post_update(base_url, body, secret=SECRET):
+    headers = {"Content-Type": "application/json"}
+    if secret:
+        headers["X-Telegram-Bot-Api-Secret-Token"] = secret
+    return await AsyncHTTPClient().fetch(
+        base_url + "/telegram", method="POST", body=body, headers=headers, raise_error=False
+    )
+
+
+def test_updates_are_queued_for_the_application():
+    async def scenario(application, base_url):
+        for update_id in (1, 2):
+            response = await post_update(base_url, json.dumps(make_update(update_id)))
+            assert response.code == 200
+        return [application.update_queue.get_nowait() for _ in range(2)]
+
+    queued = run_against_server(scenario)
+
+    assert [update.update_id for update in queued] == [1, 2]
+    assert queued[0].message.text == "/start"
+
+
+def test_wrong_secret_and_invalid_payload_are_rejected():
+    async def scenario(application, base_url):
+        wrong_secret = await post_update(base_url, json.dumps(make_update(1)), secret="wrong")
+        invalid = await post_update(base_url, "not json")
+        return wrong_secret.code, invalid.code, application.update_queue.empty()
+
+    assert run_against_server(scenario) == (403, 400, True)
+
+
+def test_health_endpoint():
+    async def scenario(application, base_url):
+        return await AsyncHTTPClient().fetch(base_url + "/health")
+
+    response = run_against_server(scenario)
+
+    assert response.code == 200
+    assert json.loads(response.body) == {"status": "starting"}
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    async def scenario(application, base_url):
+        return await AsyncHTTPClient().fetch(base_url + "/metrics")
+
+    response = run_against_server(scenario)
+
+    assert response.code == 200
+    assert response.headers["Content-Type"].startswith("text/plain")
+    assert b"# TYPE bot_update_seconds histogram" in response.body